@@ -1,7 +1,4 @@
-import json
-from google import genai
-import config
-from tools.vector_store import get_collection, query_collection
+from tools.retriever import retrieve_context
 
 def search_knowledge_base(query: str, collection_name: str) -> str:
     """
@@ -10,8 +7,9 @@ def search_knowledge_base(query: str, collection_name: str) -> str:
 
     Args:
         query (str): The natural language question or search text to look up.
-            The tool performs semantic similarity search against the chosen
-            collection and returns the top matching chunks.
+            The tool combines semantic similarity and keyword (BM25) search
+            against the chosen collection and returns the top matching chunks,
+            so exact names and acronyms are matched too.
 
         collection_name (str): The name of the ChromaDB collection to search.
             Available collections:
@@ -24,9 +22,5 @@ def search_knowledge_base(query: str, collection_name: str) -> str:
         str: The top matching chunks from the specified collection, which
         can be used as context to answer the user's question.
     """
-    # call query_vector_store and return the result
-    results = query_collection(query, collection_name)
-    return results
-
-query = "What is the key highlights of Ministry of Transport for 2026?"
-search_knowledge_base(query, "budget_2026")
\ No newline at end of file
+    # Hybrid (semantic + keyword) search, packed into a compact context
+    return retrieve_context(query, collection_name)
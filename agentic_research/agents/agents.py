@@ -1,9 +1,12 @@
+import asyncio
 import json
-from google import genai
+import time
+from google.genai import types
 import config
+from llm_client import get_client
 from agents.agent_tools import search_knowledge_base
+from tracing import current_span, span, traced
 
-client = genai.Client()          
 def run_agent(user_query: str, max_steps: int = 5):
     """Run the agent on a user query and return the final answer
     # 1. Call client.models.generate_content(...)
@@ -11,7 +14,7 @@ def run_agent(user_query: str, max_steps: int = 5):
     # 3. Return the .text from the response
     """
 
-    response = client.models.generate_content(
+    response = get_client().models.generate_content(
     model=config.DEFAULT_MODEL,                    # hint: config.DEFAULT_MODEL
     contents=user_query,                 # hint: the user's question
     config={
@@ -21,20 +24,87 @@ def run_agent(user_query: str, max_steps: int = 5):
     return response.text
 
 
-def run_agent_manual(user_query: str, max_steps: int = 5) -> str:
-    """Manual agent loop — we handle each tool call ourselves."""
-    
-    # 1. Initialise messages with the user's query
-    messages = [
-    {"role": "user", "parts": [{"text": user_query}]}
-    ]
-    
-    # 2. Loop up to max_steps times
+# Tools the manual loop may call, by the name the model sees
+TOOLS = {"search_knowledge_base": search_knowledge_base}
+
+
+def _tool_response(result):
+    # Chroma results hold enums and numpy values; the API needs plain JSON
+    return {"result": json.loads(json.dumps(result, default=str))}
+
+
+async def _call_tool(call, timeout):
+    tool = TOOLS.get(call.name)
+    if tool is None:
+        return types.Part.from_function_response(name=call.name, response={"error": f"Unknown tool {call.name}"})
+    with span(f"tool.{call.name}") as tool_span:
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(tool, **(call.args or {})), timeout)
+            response = _tool_response(result)
+        except asyncio.TimeoutError:
+            response = {"error": f"Tool {call.name} timed out after {timeout}s"}
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        if "error" in response:
+            tool_span.error = response["error"]
+    return types.Part.from_function_response(name=call.name, response=response)
+
+
+@traced("run_agent_async")
+async def run_agent_async(user_query: str, max_steps: int = 5, step_timeout: float = 60.0,
+                          token_budget: int | None = None, latency_budget: float | None = None,
+                          model_client=None) -> str:
+    """Manual agent loop — we handle each tool call ourselves.
+
+    All tool calls the model requests in one turn run concurrently, each model
+    call and tool call is bounded by step_timeout, and the loop stops once the
+    total token count or wall-clock latency exceeds its budget.
+
+    Args:
+        model_client: Anything with an async `aio.models.generate_content`,
+            defaults to the shared genai client (pass a stand-in for testing).
+    """
+    model_client = model_client or get_client()
+    generate_config = types.GenerateContentConfig(
+        tools=list(TOOLS.values()),
+        automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
+    )
+    messages = [types.Content(role="user", parts=[types.Part.from_text(text=user_query)])]
+    started = time.perf_counter()
+    tokens_used = 0
+
     for step in range(max_steps):
-        # a. Call the LLM with current messages + tools
-        # b. Check if it returned a tool call or a final answer
-        # c. If tool call → execute it, append result to messages
-        # d. If final answer → return it
-        ...
-    
-    return "Max steps reached without final answer."
\ No newline at end of file
+        try:
+            with span("agent_llm_call"):
+                response = await asyncio.wait_for(
+                    model_client.aio.models.generate_content(
+                        model=config.DEFAULT_MODEL, contents=messages, config=generate_config
+                    ),
+                    step_timeout,
+                )
+        except asyncio.TimeoutError:
+            return f"Step {step + 1} timed out after {step_timeout}s without final answer."
+        usage = getattr(response, "usage_metadata", None)
+        step_tokens = (usage.total_token_count or 0) if usage else 0
+        tokens_used += step_tokens
+        current_span().add("total_tokens", step_tokens)
+        current_span().add("steps")
+
+        calls = response.function_calls
+        if not calls:
+            return response.text
+        if token_budget is not None and tokens_used >= token_budget:
+            return f"Token budget of {token_budget} exhausted without final answer."
+        if latency_budget is not None and time.perf_counter() - started >= latency_budget:
+            return f"Latency budget of {latency_budget}s exhausted without final answer."
+
+        messages.append(response.candidates[0].content)
+        parts = await asyncio.gather(*(_call_tool(call, step_timeout) for call in calls))
+        messages.append(types.Content(role="user", parts=list(parts)))
+
+    return "Max steps reached without final answer."
+
+
+def run_agent_manual(user_query: str, max_steps: int = 5) -> str:
+    """Synchronous entry point for run_agent_async."""
+    return asyncio.run(run_agent_async(user_query, max_steps=max_steps))
@@ -0,0 +1,84 @@
+# chunker_bench.py - Micro-benchmark of chunk_text over the research corpus
+#
+# Run from agentic_research/:  python -m benchmarks.chunker_bench [--repeat N]
+
+import argparse
+import time
+
+from config import RESEARCH_DIR
+from tools.chunker import chunk_text, chunk_spans, stream_chunks, whitespace_tokenizer
+from tools.local_search import load_knowledge_base
+
+
+def legacy_chunk_text(text, chunk_size=1000, overlap=200):
+    # The previous rfind-per-window implementation, kept as the reference output
+    min_chunk = int(chunk_size - overlap)
+    chunks = []
+    start = 0
+    while start < (len(text) - overlap):
+        end = min(start + chunk_size, len(text))
+        temp_chunk = text[start:end]
+        if temp_chunk.rfind("\n\n") != -1 and temp_chunk.rfind("\n\n") >= min_chunk:
+            end_adj = temp_chunk.rfind("\n\n")
+        elif temp_chunk.rfind("\n") != -1 and temp_chunk.rfind("\n") >= min_chunk:
+            end_adj = temp_chunk.rfind("\n")
+        elif temp_chunk.rfind(".") != -1 and temp_chunk.rfind(".") >= min_chunk:
+            end_adj = temp_chunk.rfind(".")
+        else:
+            end_adj = len(temp_chunk)
+
+        if end_adj <= overlap:
+            end_adj = len(temp_chunk)
+
+        chunks.append(text[start:start + end_adj])
+        start += end_adj - overlap
+    return chunks
+
+
+def _time(fn, docs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for doc in docs:
+            fn(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--path", default=str(RESEARCH_DIR / "budget_2026"))
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    docs = list(load_knowledge_base(path=args.path).values())
+    n_bytes = sum(len(doc.encode("utf-8")) for doc in docs)
+    size, overlap = args.chunk_size, args.overlap
+
+    for doc in docs:
+        if chunk_text(doc, size, overlap) != legacy_chunk_text(doc, size, overlap):
+            raise SystemExit("chunk_text output differs from the legacy chunker")
+        lines = doc.splitlines(keepends=True)
+        if list(stream_chunks(lines, size, overlap)) != chunk_text(doc, size, overlap):
+            raise SystemExit("stream_chunks output differs from chunk_text")
+        token_args = (size // 4, overlap // 4, whitespace_tokenizer)
+        if list(stream_chunks(lines, *token_args)) != chunk_text(doc, *token_args):
+            raise SystemExit("stream_chunks output differs from chunk_text in token mode")
+
+    cases = {
+        "legacy rfind": lambda doc: legacy_chunk_text(doc, size, overlap),
+        "chunk_text": lambda doc: chunk_text(doc, size, overlap),
+        "chunk_spans": lambda doc: chunk_spans(doc, size, overlap),
+        "stream_chunks (lines)": lambda doc: list(stream_chunks(doc.splitlines(keepends=True), size, overlap)),
+        "chunk_text (tokens)": lambda doc: chunk_text(doc, size // 4, overlap // 4, tokenizer=whitespace_tokenizer),
+    }
+    print(f"{len(docs)} files, {n_bytes / 1e6:.2f} MB, chunk_size={size}, overlap={overlap}, best of {args.repeat}")
+    for name, fn in cases.items():
+        seconds = _time(fn, docs, args.repeat)
+        print(f"  {name:<24} {seconds * 1000:8.2f} ms  {n_bytes / seconds / 1e6:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
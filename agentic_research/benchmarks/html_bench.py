@@ -0,0 +1,81 @@
+# html_bench.py - Pages/s and output size of HTML parsing and markdown conversion
+#
+# Run from agentic_research/:  python -m benchmarks.html_bench [--html-dir DIR]
+#
+# DIR holds saved .html pages, e.g. from crawl(urls, "budget_2026", html_dir=Path("research/html")).
+# Without saved pages, pages are synthesised from the research/budget_2026 markdown
+# wrapped in typical gov.sg navigation and footer chrome.
+
+import argparse
+import html
+import time
+from pathlib import Path
+
+from config import RESEARCH_DIR
+from tools.local_search import load_knowledge_base
+from tools.web_scraper import PARSE_BACKENDS, _installed, html_to_markdown, html_to_text, convert_many
+
+_CHROME_HEAD = """<html><head><title>{title}</title><script>var analytics = {{}};</script>
+<style>body {{ font-family: sans-serif; }}</style></head><body>
+<header><a href="#main">Skip to main content</a><p>A Singapore Government Agency Website</p>
+<nav><ul>""" + "".join(f'<li><a href="/section-{i}/">Section {i}</a></li>' for i in range(40)) + """</ul></nav></header>
+<main id="main">"""
+_CHROME_TAIL = """</main><aside><h2>Related</h2><ul>""" + "".join(
+    f'<li><a href="/news/{i}/">Related story {i}</a></li>' for i in range(20)
+) + """</ul></aside><footer><p>Contact us</p><p>Report vulnerability</p><p>Privacy statement</p></footer></body></html>"""
+
+
+def synthesise_pages(path):
+    pages = []
+    for title, doc in load_knowledge_base(path=path).items():
+        body = "".join(f"<p>{html.escape(p)}</p>\n" for p in doc.split("\n\n") if p.strip())
+        pages.append(_CHROME_HEAD.format(title=html.escape(title)) + body + _CHROME_TAIL)
+    return pages
+
+
+def _bench(fn, pages, repeat):
+    best, out_bytes = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outputs = [fn(page) for page in pages]
+        best = min(best, time.perf_counter() - start)
+        out_bytes = sum(len(o.encode("utf-8")) for o in outputs)
+    return best, out_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--html-dir", type=Path)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.html_dir and any(args.html_dir.glob("*.html")):
+        pages = [p.read_text(encoding="utf-8", errors="ignore") for p in sorted(args.html_dir.glob("*.html"))]
+        source = str(args.html_dir)
+    else:
+        pages = synthesise_pages(RESEARCH_DIR / "budget_2026")
+        source = "synthesised from research/budget_2026"
+    in_bytes = sum(len(p.encode("utf-8")) for p in pages)
+    print(f"{len(pages)} pages ({source}), {in_bytes / 1e6:.2f} MB of HTML, best of {args.repeat}")
+
+    backends = [b for b, module in PARSE_BACKENDS.items() if b == "html.parser" or _installed(module)]
+    print(f"  {'case':<40} {'pages/s':>9} {'output KB':>10}")
+    for backend in backends:
+        for main_content in (False, True):
+            for kind, fn in (("text", html_to_text), ("markdown", html_to_markdown)):
+                seconds, out_bytes = _bench(lambda page: fn(page, main_content=main_content, backend=backend),
+                                            pages, args.repeat)
+                name = f"{kind} {backend}{' +main' if main_content else ''}"
+                print(f"  {name:<40} {len(pages) / seconds:9.1f} {out_bytes / 1e3:10.1f}")
+
+    batch = pages * max(1, 64 // len(pages))
+    for workers in (1, args.workers):
+        start = time.perf_counter()
+        convert_many(batch, workers=workers)
+        seconds = time.perf_counter() - start
+        print(f"  {'convert_many x' + str(len(batch)) + ' workers=' + str(workers):<40} {len(batch) / seconds:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# retrieval_bench.py - Offline retrieval latency / recall benchmark over the bundled corpus
+#
+# Run from agentic_research/:
+#   python -m benchmarks.retrieval_bench [--chunk-sizes 500,1000] [--overlaps 100,200] [--n-results 3,5,10]
+#                                        [--modes dense,hybrid,context] [--baseline FILE [--save-baseline]]
+#
+# The corpus is indexed into an in-memory Chroma client with a local hashing
+# embedding function (no model download, no network, nothing written to
+# chroma_db), once per chunk size / overlap. Every question in
+# retrieval_questions.jsonl is then asked through each retrieval path:
+#   dense    query_collection
+#   hybrid   retriever.hybrid_query (dense + BM25)
+#   context  retriever.retrieve_context, i.e. what search_knowledge_base returns
+# A question is answered at k if one of its evidence phrases appears in the
+# top-k results. Recall is over the questions whose evidence survived chunking
+# intact ("answerable"), so different chunkings are compared fairly.
+#
+# With --baseline, rows are compared to a previous run and the exit status is
+# non-zero if recall dropped or p95 latency grew beyond the tolerances.
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from config import RESEARCH_DIR
+from tools import bm25_index, vector_store
+from tools.indexer import iter_chunks
+from tools.retriever import hybrid_query, retrieve_context
+from tools.vector_store import delete_collection, ingest_chunks, query_collection
+
+QUESTIONS_PATH = Path(__file__).with_name("retrieval_questions.jsonl")
+MODES = ("dense", "hybrid", "context")
+
+
+class HashingEmbeddingFunction:
+    """
+    Deterministic bag-of-words embedding: unigrams and bigrams hashed into dim
+    signed buckets, L2 normalised. Crude next to MiniLM, but local and stable,
+    which is what run-to-run comparisons need.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def __call__(self, input):
+        embeddings = []
+        for text in input:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            words = re.findall(r"\w+", text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                vector[digest % self.dim] += 1.0 if digest >> 63 else -1.0
+            norm = np.linalg.norm(vector)
+            embeddings.append(vector / norm if norm else vector)
+        return embeddings
+
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+
+def load_questions(path=QUESTIONS_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+    for question in questions:
+        question["evidence"] = [normalize(phrase) for phrase in question["evidence"]]
+    return questions
+
+
+def _relevant(question, text):
+    text = normalize(text)
+    return any(phrase in text for phrase in question["evidence"])
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def use_offline_backend(embedding="hashing"):
+    """Points vector_store at an in-memory Chroma client and BM25 indexes at a temp dir."""
+    import chromadb
+    vector_store._client = chromadb.EphemeralClient()
+    if embedding == "hashing":
+        vector_store._embedding_function = HashingEmbeddingFunction()
+    bm25_index.BM25_DIR = Path(tempfile.mkdtemp(prefix="bm25_bench_"))
+
+
+def index_corpus(path, chunk_size, overlap):
+    collection_name = f"bench_{chunk_size}_{overlap}"
+    delete_collection(collection_name)
+    chunks = list(iter_chunks(path, chunk_size, overlap))
+    stats = ingest_chunks(collection_name, chunks)
+    return collection_name, [document for _, document, _ in chunks], stats
+
+
+def retrieve(mode, question, collection_name, k):
+    # Returns the retrieved texts, best first
+    if mode == "dense":
+        return query_collection(question, collection_name, n_results=k)["documents"][0]
+    if mode == "hybrid":
+        return [hit["document"] for hit in hybrid_query(question, collection_name, n_results=k)]
+    return [retrieve_context(question, collection_name, n_results=k)]
+
+
+def run_mode(mode, questions, collection_name, k, repeat=3, workers=1):
+    """Asks every question `repeat` times; returns latency percentiles, throughput, recall@k and MRR."""
+    def ask(question):
+        # Measure the search itself, not the query cache
+        vector_store.query_cache.invalidate(collection_name)
+        start = time.perf_counter()
+        results = retrieve(mode, question["question"], collection_name, k)
+        return time.perf_counter() - start, results
+
+    latencies, ranks = [], {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(repeat):
+            for question, (seconds, results) in zip(questions, pool.map(ask, questions)):
+                latencies.append(seconds)
+                ranks[question["id"]] = next(
+                    (rank for rank, text in enumerate(results, 1) if _relevant(question, text)), None)
+    wall = time.perf_counter() - started
+
+    found = [rank for rank in ranks.values() if rank is not None]
+    return {
+        "p50_ms": round(_percentile(latencies, 0.5) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3),
+        "qps": round(len(latencies) / wall, 1),
+        "hits": len(found),
+        "mrr": round(sum(1 / rank for rank in found) / len(questions), 3) if questions else 0.0,
+        "missed": sorted(qid for qid, rank in ranks.items() if rank is None),
+    }
+
+
+def compare(rows, baseline_rows, recall_tolerance, latency_tolerance):
+    key = lambda row: (row["chunk_size"], row["overlap"], row["mode"], row["k"])
+    baseline = {key(row): row for row in baseline_rows}
+    failures = []
+    for row in rows:
+        before = baseline.get(key(row))
+        if before is None:
+            continue
+        name = "chunk_size={} overlap={} mode={} k={}".format(*key(row))
+        if row["recall"] < before["recall"] - recall_tolerance:
+            failures.append(f"{name}: recall {before['recall']} -> {row['recall']}")
+        if row["p95_ms"] > before["p95_ms"] * (1 + latency_tolerance):
+            failures.append(f"{name}: p95 {before['p95_ms']} ms -> {row['p95_ms']} ms")
+    return failures
+
+
+def _ints(text):
+    return [int(value) for value in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval latency / recall benchmark.")
+    parser.add_argument("--path", type=Path, default=RESEARCH_DIR / "budget_2026")
+    parser.add_argument("--questions", type=Path, default=QUESTIONS_PATH)
+    parser.add_argument("--chunk-sizes", type=_ints, default=[1000])
+    parser.add_argument("--overlaps", type=_ints, default=[200])
+    parser.add_argument("--n-results", type=_ints, default=[3, 5, 10])
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--embedding", choices=("hashing", "default"), default="hashing",
+                        help="default uses Chroma's MiniLM (needs the model cached locally)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent queries when measuring throughput")
+    parser.add_argument("--output", type=Path, help="Write result rows as JSONL")
+    parser.add_argument("--baseline", type=Path, help="JSONL rows of a previous run to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's rows to --baseline")
+    parser.add_argument("--recall-tolerance", type=float, default=0.0)
+    parser.add_argument("--latency-tolerance", type=float, default=0.5, help="Allowed relative p95 growth")
+    args = parser.parse_args()
+
+    use_offline_backend(args.embedding)
+    questions = load_questions(args.questions)
+    modes = args.modes.split(",")
+    rows = []
+    print(f"{'size':>5} {'ovl':>4} {'chunks':>6} {'mode':>8} {'k':>3} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'qps':>7} {'recall':>7} {'mrr':>6}")
+    for chunk_size in args.chunk_sizes:
+        for overlap in args.overlaps:
+            if overlap >= chunk_size:
+                continue
+            collection_name, documents, ingest = index_corpus(args.path, chunk_size, overlap)
+            # Evidence split across a chunk boundary can't be retrieved by any mode
+            answerable = [q for q in questions if any(_relevant(q, document) for document in documents)]
+            for mode in modes:
+                for k in args.n_results:
+                    result = run_mode(mode, answerable, collection_name, k, args.repeat, args.workers)
+                    row = {
+                        "embedding": args.embedding, "chunk_size": chunk_size, "overlap": overlap,
+                        "chunks": ingest["chunks"], "index_s": ingest["seconds"], "mode": mode, "k": k,
+                        "questions": len(questions), "answerable": len(answerable),
+                        "recall": round(result["hits"] / len(answerable), 3) if answerable else 0.0,
+                        **result,
+                    }
+                    rows.append(row)
+                    print(f"{chunk_size:>5} {overlap:>4} {row['chunks']:>6} {mode:>8} {k:>3} {row['p50_ms']:>8.2f} "
+                          f"{row['p95_ms']:>8.2f} {row['qps']:>7.1f} {row['recall']:>7.3f} {row['mrr']:>6.3f}")
+            delete_collection(collection_name)
+
+    if args.output:
+        args.output.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+    if args.baseline and args.save_baseline:
+        args.baseline.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+        print(f"baseline written to {args.baseline}")
+        return
+    if args.baseline and args.baseline.exists():
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline_rows = [json.loads(line) for line in f if line.strip()]
+        failures = compare(rows, baseline_rows, args.recall_tolerance, args.latency_tolerance)
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
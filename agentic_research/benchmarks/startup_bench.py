@@ -0,0 +1,78 @@
+# startup_bench.py - Cold-start import time of the entry point, with a regression gate
+#
+# Run from agentic_research/:  python -m benchmarks.startup_bench [--max-ms 300] [--baseline FILE]
+#
+# Each run imports the module in a fresh interpreter under `python -X importtime`
+# (without GEMINI_API_KEY, like an offline re-index) and reads the cumulative
+# time of the top-level import. Exits non-zero when the median exceeds --max-ms,
+# regresses more than --tolerance over a saved baseline, or when one of the
+# heavy modules that should only load on first use is imported eagerly.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Loaded on demand by the code paths that need them, never by `import main`
+LAZY_MODULES = ("chromadb", "google.genai", "bs4", "html2text", "httpx", "selectolax", "tiktoken")
+
+
+def import_profile(module):
+    """Imports module in a fresh interpreter and returns {module name: (self_us, cumulative_us)}."""
+    env = {k: v for k, v in os.environ.items() if k != "GEMINI_API_KEY"}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=env, cwd=Path(__file__).resolve().parents[1])
+    if result.returncode != 0:
+        sys.exit(f"import {module} failed:\n{result.stderr}")
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=300.0, help="Fail if the median import time is above this")
+    parser.add_argument("--baseline", type=Path, help="JSON file with a previous median_ms to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression over the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's median to --baseline")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.repeat)]
+    median_ms = statistics.median(p[args.module][1] for p in profiles) / 1000
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.repeat} runs")
+
+    slowest = sorted(profiles[-1].items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"  {self_us / 1000:7.1f} ms self  {cumulative_us / 1000:7.1f} ms cumulative  {name}")
+
+    failures = []
+    eager = sorted(name for name in profiles[-1] if name in LAZY_MODULES)
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+    if median_ms > args.max_ms:
+        failures.append(f"median {median_ms:.1f} ms is over the {args.max_ms:.0f} ms budget")
+    if args.baseline and args.baseline.exists() and not args.save_baseline:
+        baseline_ms = json.loads(args.baseline.read_text())["median_ms"]
+        if median_ms > baseline_ms * (1 + args.tolerance):
+            failures.append(f"median {median_ms:.1f} ms regressed from baseline {baseline_ms:.1f} ms")
+    if args.baseline and args.save_baseline:
+        args.baseline.write_text(json.dumps({"module": args.module, "median_ms": round(median_ms, 1)}))
+        print(f"baseline written to {args.baseline}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
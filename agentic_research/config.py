@@ -9,8 +9,10 @@ load_dotenv()
 # API Keys
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in .env file")
+def require_api_key():
+    # Only checked when an LLM client is created, so offline indexing works without a key
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY not found in .env file")
 
 #CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
 
@@ -21,6 +23,23 @@ DEFAULT_MODEL = "gemini-2.5-flash-lite"  # or "claude"
 MAX_TOKENS = 1000
 TEMPERATURE = 0.7
 
+# Query result cache. Exact repeats only by default; set QUERY_CACHE_SIMILARITY
+# (e.g. 0.95) to also let near-duplicate queries reuse a cached query's results
+QUERY_CACHE_SIZE = 256
+QUERY_CACHE_TTL = 600  # seconds
+QUERY_CACHE_SIMILARITY = float(os.environ["QUERY_CACHE_SIMILARITY"]) if os.getenv("QUERY_CACHE_SIMILARITY") else None
+
+# Tracing: append every span to this JSONL file (also settable with --trace)
+TRACE_PATH = os.getenv("TRACE_PATH")
+
+# LLM response cache
+LLM_CACHE_MAX_BYTES = 50_000_000
+
 #Paths 
 RESEARCH_DIR = Path("research")
-CHROMA_DIR = Path("chroma_db")
\ No newline at end of file
+CRAWL_META_PATH = RESEARCH_DIR / ".crawl_meta.json"
+CHROMA_DIR = Path("chroma_db")
+MANIFEST_PATH = CHROMA_DIR / "manifest.json"
+BM25_DIR = CHROMA_DIR / "bm25"
+CACHE_DIR = Path(".cache")
+LLM_CACHE_PATH = CACHE_DIR / "llm_responses.sqlite3"
\ No newline at end of file
@@ -1,12 +1,70 @@
 # llm_client.py - Abstraction layer for LLM APIs
+import threading
 import config
-from google import genai
+from llm_cache import ResponseCache, make_key
+from tracing import current_span, traced, tracer
 
-# Configure the API key
-client = genai.Client()
+# Created on first use, so importing this module costs nothing (google.genai
+# alone takes ~0.5s to import) and works without an API key
+_client = None
+_response_cache = None
+_lock = threading.Lock()
 
-def generate_response(prompt,model=config.DEFAULT_MODEL):
-    response = client.models.generate_content(
-    model=model, contents=prompt
-    )
-    return response.text
+def get_client():
+    """Returns the process-wide genai client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                config.require_api_key()
+                from google import genai
+                _client = genai.Client()
+    return _client
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        with _lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(config.LLM_CACHE_PATH, max_bytes=config.LLM_CACHE_MAX_BYTES)
+    return _response_cache
+
+# Reports nothing until the cache has been opened
+tracer.register_collector("llm_cache", lambda: _response_cache.stats() if _response_cache else {})
+
+@traced("generate_response")
+def generate_response_with_usage(prompt,model=config.DEFAULT_MODEL,use_cache=True):
+    """
+    Like generate_response, but returns (text, usage), where usage holds the
+    "prompt_tokens", "output_tokens" and "total_tokens" of the API call and
+    "cached", which is True (with zero tokens) when no call was made.
+    """
+    settings = {"max_output_tokens": config.MAX_TOKENS, "temperature": config.TEMPERATURE}
+    usage = {"prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0, "cached": True}
+
+    def call():
+        response = get_client().models.generate_content(
+        model=model, contents=prompt, config=settings
+        )
+        metadata = response.usage_metadata
+        usage["cached"] = False
+        if metadata:
+            usage["prompt_tokens"] = metadata.prompt_token_count or 0
+            usage["output_tokens"] = metadata.candidates_token_count or 0
+            usage["total_tokens"] = metadata.total_token_count or 0
+        return response.text
+
+    if not use_cache:
+        text = call()
+    else:
+        # Identical (model, prompt, settings) are served from disk, and concurrent
+        # identical requests share one API call
+        text = get_response_cache().get_or_compute(make_key(model, prompt, settings), model, call)
+    span = current_span()
+    span.add("cache_hits" if usage["cached"] else "cache_misses")
+    for counter in ("prompt_tokens", "output_tokens", "total_tokens"):
+        span.add(counter, usage[counter])
+    return text, usage
+
+def generate_response(prompt,model=config.DEFAULT_MODEL,use_cache=True):
+    return generate_response_with_usage(prompt, model, use_cache)[0]
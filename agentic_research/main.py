@@ -1,16 +1,33 @@
 # main.py - Entry point
+#
+#   python main.py ingest [--path research/budget_2026] [--full]
+#   python main.py query "Who spoke for MOE?" [--agent]
+#   python main.py batch questions.jsonl [--workers 8] [--output answers.jsonl]
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
 
 from config import DEFAULT_MODEL
 from config import RESEARCH_DIR
-from llm_client import generate_response
-from tools.web_scraper import fetch_page, fetch_page_to_md
+from llm_client import generate_response, generate_response_with_usage
+from tracing import traced, tracer
 from tools.local_search import load_knowledge_base
 from tools.chunker import chunk_text
-from tools.vector_store import get_collection, add_to_collection, delete_collection
+from tools.vector_store import delete_collection
+from tools.retriever import retrieve_context
+from tools.indexer import sync_collection, reset_manifest
 from agents.agent_tools import search_knowledge_base
-from agents.agents import run_agent
+
+# Scraping (bs4, html2text, httpx) and the agent (google.genai) are imported
+# inside the functions that need them, keeping startup fast for indexing and
+# retrieval; benchmarks/startup_bench.py guards this.
 
 def summarize_page():
+    from tools.web_scraper import fetch_page
     url = "https://www.mot.gov.sg/news-resources/newsroom/speech-by-acting-minister-for-transport-mr-jeffrey-siow-at-ministry-of-transport-s-committee-of-supply-debate-2026/"
     background = fetch_page(url)
     prompt = f"Based on the following text: {background},\n\nsummarize on the main points and key takeaways."
@@ -18,31 +35,192 @@ def summarize_page():
     print(response)
 
 def html_to_md(url):
+    from tools.web_scraper import fetch_page_to_md
     fetch_page_to_md(url, subfolder="budget_2026")
 
+def urls_to_md(urls, subfolder="budget_2026"):
+    from tools.crawler import crawl_pages
+    # Concurrent, conditional fetch of many pages; unchanged pages are skipped
+    results = crawl_pages(urls, subfolder=subfolder)
+    for result in results:
+        print(result["status"], result["url"], result["error"] or "")
+    return results
+
 def fetch_knowledge_base(path=RESEARCH_DIR/'budget_2026'):
     knowledge_base = load_knowledge_base(path=path)
     return knowledge_base
 
 def collection_full_refresh(path=RESEARCH_DIR/'budget_2026'):
-    knowledge_base = load_knowledge_base(path=path)
     collection_name = path.name
     delete_collection(collection_name)
-    for title, doc in knowledge_base.items():
-        chunks = chunk_text(doc)
-        ids = [f"{title}_{i}" for i, chunk in enumerate(chunks)]
-        documents = [chunk for i, chunk in enumerate(chunks)]
-        metadatas = [{"title": title, "sub_folder": path.name, "chunk_index": i} for i, chunk in enumerate(chunks)]
-        add_to_collection(collection_name, ids=ids, documents=documents, metadatas=metadatas)
+    reset_manifest(collection_name)
+    return sync_collection(path, collection_name)
+
+def collection_sync(path=RESEARCH_DIR/'budget_2026'):
+    # Only embeds new/changed chunks and drops chunks of removed files
+    stats = sync_collection(path, path.name)
+    print(stats)
+    return stats
+
+@traced("answer_question")
+def answer_question(query, collection_name, n_results=3, model=DEFAULT_MODEL, use_cache=True):
+    """
+    Answers one question from the collection (hybrid retrieval, then one LLM call).
+
+    Returns:
+        dict: "question", "answer", "retrieval_s", "latency_s", "context_words"
+        and the LLM usage from generate_response_with_usage.
+    """
+    start = time.perf_counter()
+    context = retrieve_context(query, collection_name, n_results=n_results)
+    retrieved = time.perf_counter()
+    prompt = f"Based on the following context: {context},\n\nanswer the question: {query}"
+    answer, usage = generate_response_with_usage(prompt, model=model, use_cache=use_cache)
+    return {
+        "question": query,
+        "answer": answer,
+        "retrieval_s": round(retrieved - start, 4),
+        "latency_s": round(time.perf_counter() - start, 4),
+        "context_words": len(context.split()),
+        **usage,
+    }
+
 def query_knowledge_base(query, collection_name):
-    collection = get_collection(collection_name)
-    results = collection.query(query_texts=[f"{query}"], n_results=3)
-    prompt = f"Based on the following context: {results},\n\nanswer the question: {query}"
-    response = generate_response(prompt)
+    response = answer_question(query, collection_name)["answer"]
     print(response)
-        
+
+def answer_batch(questions, collection_name, workers=4, n_results=3, model=DEFAULT_MODEL, use_cache=True):
+    """
+    Answers many questions concurrently, yielding each result as soon as it is done.
+
+    Args:
+        questions (Iterable[dict]): {"question", optional "id" and "collection"}.
+            Consumed lazily, at most 2 * workers questions are in flight.
+        collection_name (str): Collection for questions that don't name one.
+        workers (int): Number of questions answered at once.
+
+    Yields:
+        dict: answer_question's result plus "id", or "id", "question" and
+        "error" for a question that failed.
+    """
+    def run(item):
+        try:
+            result = answer_question(item["question"], item.get("collection") or collection_name,
+                                     n_results=n_results, model=model, use_cache=use_cache)
+        except Exception as e:
+            result = {"question": item.get("question"), "error": f"{type(e).__name__}: {e}"}
+        return {"id": item.get("id"), **result}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for item in questions:
+            pending.add(pool.submit(run, item))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (future.result() for future in done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (future.result() for future in done)
+
+def read_questions(path):
+    # One JSON object per line, or a bare string; the line number is the default id
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            item.setdefault("id", line_number)
+            yield item
+
+def cmd_ingest(args):
+    path = Path(args.path)
+    collection_name = args.collection or path.name
+    if args.full:
+        delete_collection(collection_name)
+        reset_manifest(collection_name)
+    stats = sync_collection(path, collection_name, chunk_size=args.chunk_size, overlap=args.overlap,
+                            batch_size=args.batch_size, workers=args.workers)
+    print(json.dumps(stats))
+
+def cmd_query(args):
+    if args.agent:
+        from agents.agents import run_agent_manual
+        print(run_agent_manual(args.question))
+        return
+    result = answer_question(args.question, args.collection, n_results=args.n_results, use_cache=not args.no_cache)
+    print(result["answer"])
+    print(json.dumps({k: v for k, v in result.items() if k not in ("question", "answer")}), file=sys.stderr)
+
+def cmd_batch(args):
+    output = open(args.output, "w", encoding="utf-8") if args.output != "-" else sys.stdout
+    start = time.perf_counter()
+    n_answered = n_failed = total_tokens = 0
+    try:
+        for result in answer_batch(read_questions(args.questions), args.collection, workers=args.workers,
+                                   n_results=args.n_results, use_cache=not args.no_cache):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            if "error" in result:
+                n_failed += 1
+            else:
+                n_answered += 1
+                total_tokens += result["total_tokens"]
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    summary = {"answered": n_answered, "failed": n_failed, "total_tokens": total_tokens,
+               "seconds": round(time.perf_counter() - start, 3)}
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if n_failed else 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Agentic research over local knowledge bases.")
+    parser.add_argument("--trace", help="Append every span to this JSONL file")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics at :PORT/metrics while running")
+    parser.add_argument("--stats", action="store_true", help="Print per-stage timings and counters to stderr on exit")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser("ingest", help="Index (incrementally) a folder of markdown files")
+    ingest.add_argument("--path", default=str(RESEARCH_DIR / "budget_2026"))
+    ingest.add_argument("--collection", help="Defaults to the folder name")
+    ingest.add_argument("--full", action="store_true", help="Drop the collection and rebuild it from scratch")
+    ingest.add_argument("--chunk-size", type=int, default=1000)
+    ingest.add_argument("--overlap", type=int, default=200)
+    ingest.add_argument("--batch-size", type=int, default=128)
+    ingest.add_argument("--workers", type=int, default=4)
+    ingest.set_defaults(func=cmd_ingest)
+
+    query = subparsers.add_parser("query", help="Answer one question")
+    query.add_argument("question")
+    query.add_argument("--collection", default="budget_2026")
+    query.add_argument("--n-results", type=int, default=3)
+    query.add_argument("--agent", action="store_true", help="Let the agent decide when to search")
+    query.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
+    query.set_defaults(func=cmd_query)
+
+    batch = subparsers.add_parser("batch", help="Answer a JSONL file of questions concurrently")
+    batch.add_argument("questions", help='JSONL file of {"question": ..., "id": ..., "collection": ...}')
+    batch.add_argument("--collection", default="budget_2026")
+    batch.add_argument("--workers", type=int, default=4)
+    batch.add_argument("--n-results", type=int, default=3)
+    batch.add_argument("--output", default="-", help="JSONL results file, - for stdout")
+    batch.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
+    batch.set_defaults(func=cmd_batch)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.trace:
+        tracer.export_jsonl(args.trace)
+    if args.metrics_port:
+        tracer.serve_metrics(args.metrics_port)
+    try:
+        return args.func(args)
+    finally:
+        if args.stats:
+            print(json.dumps(tracer.summary(), indent=2), file=sys.stderr)
+
 if __name__ == "__main__":
-    # print(search_knowledge_base("What are the key opportunities as one of the transport operators in Singapore?", "budget_2026"))
-    # collection_full_refresh(path=RESEARCH_DIR/'budget_2026')
-    answer = run_agent("Who were the speakers for Ministry of Education in Singapore's Budget 2026?")
-    print(answer)
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import atexit
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from config import BM25_DIR
+
+_TOKEN = re.compile(r"\w+")
+# Chunk changes an incidental write may leave unsaved; bulk writers save explicitly
+SAVE_EVERY = 1000
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Incremental inverted index with Okapi BM25 scoring, kept next to a Chroma
+    collection so exact terms (minister names, scheme acronyms) that dense
+    embeddings blur can still be matched.
+
+    Only per-chunk term frequencies are persisted; postings are rebuilt in
+    memory on load, and add/remove update both incrementally. Writes are
+    batched: save(min_changes) skips the rewrite until enough chunks changed,
+    and whatever is still unsaved is flushed at exit.
+    """
+
+    def __init__(self, path, k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._docs = {}  # chunk id -> {term: tf}
+        self._lengths = {}
+        self._postings = {}  # term -> {chunk id: tf}
+        self._total_length = 0
+        self._unsaved = 0  # chunks added or removed since the last save
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # keeps saves (and their tmp file) in order
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for doc_id, terms in json.load(f)["docs"].items():
+                    self._index(doc_id, terms)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _index(self, doc_id, terms):
+        self._docs[doc_id] = terms
+        length = sum(terms.values())
+        self._lengths[doc_id] = length
+        self._total_length += length
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def _unindex(self, doc_id):
+        terms = self._docs.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def add(self, ids, documents):
+        """Indexes documents, replacing any earlier version of the same ids."""
+        with self._lock:
+            for doc_id, document in zip(ids, documents):
+                self._unindex(doc_id)
+                self._index(doc_id, dict(Counter(tokenize(document))))
+                self._unsaved += 1
+
+    def remove(self, ids):
+        with self._lock:
+            for doc_id in ids:
+                self._unindex(doc_id)
+                self._unsaved += 1
+
+    def search(self, query, n_results=20):
+        """Returns up to n_results (chunk id, score) pairs, best first."""
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs
+            scores = Counter()
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            return scores.most_common(n_results)
+
+    def save(self, min_changes=1):
+        """Rewrites the index file if at least min_changes chunks changed since the last save."""
+        with self._save_lock:
+            with self._lock:
+                if self._unsaved < min_changes and self.path.exists():
+                    return
+                # Serialized under the lock, so concurrent add/remove can't tear the snapshot
+                payload = json.dumps({"docs": self._docs})
+                saved = self._unsaved
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+            with self._lock:
+                self._unsaved -= saved
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(collection_name, collection=None):
+    """
+    Returns the BM25 index of a collection, loading it from BM25_DIR once per
+    process. If there is none on disk yet, it is built from the documents
+    already in the (given) Chroma collection.
+    """
+    with _indexes_lock:
+        index = _indexes.get(collection_name)
+        if index is None:
+            index = BM25Index(BM25_DIR / f"{collection_name}.json")
+            if not index.path.exists() and collection is not None and collection.count():
+                existing = collection.get(include=["documents"])
+                index.add(existing["ids"], existing["documents"])
+                index.save()
+            _indexes[collection_name] = index
+        return index
+
+
+@atexit.register
+def flush_lexical_indexes():
+    """Saves every loaded index that has unsaved changes."""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.save()
+
+
+def drop_lexical_index(collection_name):
+    with _indexes_lock:
+        _indexes.pop(collection_name, None)
+        try:
+            os.remove(BM25_DIR / f"{collection_name}.json")
+        except FileNotFoundError:
+            pass
@@ -1,54 +1,183 @@
-def chunk_text(text, chunk_size=1000, overlap=200):
+import re
+from bisect import bisect_left
+
+from tracing import traced
+
+# Preferred chunk boundaries, strongest first
+_SEPARATORS = ("\n\n", "\n", ".")
+
+
+def whitespace_tokenizer(text):
+    """Splits on whitespace, returning the (start, end) span of every token."""
+    return [m.span() for m in re.finditer(r"\S+", text)]
+
+
+def tiktoken_tokenizer(encoding_name="cl100k_base"):
+    """
+    Builds a tokenizer from a tiktoken encoding (optional dependency), so chunk
+    budgets can be expressed in the same tokens the embedding/LLM limits use.
+    """
+    import tiktoken
+
+    encoding = tiktoken.get_encoding(encoding_name)
+
+    def tokenize(text):
+        tokens = encoding.encode(text, disallowed_special=())
+        _, starts = encoding.decode_with_offsets(tokens)
+        ends = starts[1:] + [len(text)]
+        return list(zip(starts, ends))
+
+    return tokenize
+
+
+class _ChunkStream:
+    """
+    Single pass chunking engine over a stream of text pieces.
+
+    A window can only be cut in its last `overlap` units (anything earlier
+    would leave less than chunk_size - overlap behind), so each separator is
+    searched once, in place, over just that tail instead of rfind-ing a fresh
+    copy of the whole window. Sizes are measured in "units": characters, or
+    tokens when a tokenizer is given (each piece is tokenized on its own).
+    """
+
+    def __init__(self, pieces, chunk_size, overlap, tokenizer=None, trim=False):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be greater than 0")
+        if overlap < 0:
+            raise ValueError("overlap must be non-negative")
+        if overlap >= chunk_size:
+            raise ValueError("overlap must be smaller than chunk_size")
+        self._pieces = iter(pieces)
+        self._chunk_size = chunk_size
+        self._overlap = overlap
+        self._tokenizer = tokenizer
+        self._trim_enabled = trim
+        self._buf = ""
+        self._pending = []
+        self._base = 0  # global char offset of self._buf[0]
+        self._total = 0  # chars received so far
+        self._done = False
+        self._token_starts = []
+        self._unit_base = 0  # global token index of self._token_starts[0]
+
+    def _n_units(self):
+        if self._tokenizer is None:
+            return self._total
+        return self._unit_base + len(self._token_starts)
+
+    def _char_of(self, unit):
+        if self._tokenizer is None:
+            return unit
+        index = unit - self._unit_base
+        return self._token_starts[index] if index < len(self._token_starts) else self._total
+
+    def _unit_of(self, char):
+        if self._tokenizer is None:
+            return char
+        return self._unit_base + bisect_left(self._token_starts, char)
+
+    def _feed(self):
+        piece = next(self._pieces, None)
+        if piece is None:
+            self._done = True
+            return
+        if self._tokenizer is not None:
+            self._token_starts.extend(self._total + start for start, _ in self._tokenizer(piece))
+        self._pending.append(piece)
+        self._total += len(piece)
+
+    def _trim(self, start_unit):
+        # Drop consumed text once it is most of the buffer, so copies stay amortised O(1) per char
+        new_base = self._char_of(start_unit)
+        if not self._trim_enabled or new_base - self._base <= len(self._buf) // 2:
+            return
+        self._buf = self._buf[new_base - self._base:]
+        self._base = new_base
+        if self._tokenizer is not None:
+            del self._token_starts[:start_unit - self._unit_base]
+            self._unit_base = start_unit
+
+    def spans(self):
+        """Yields the (start, end) char span of every chunk, in global offsets."""
+        chunk_size, overlap = self._chunk_size, self._overlap
+        min_chunk = chunk_size - overlap
+        start = 0
+        while True:
+            while not self._done and self._n_units() <= start + chunk_size:
+                self._feed()
+            if self._pending:
+                self._buf += "".join(self._pending)
+                self._pending = []
+            n_units = self._n_units()
+            if start >= n_units - overlap:
+                return
+            end = min(start + chunk_size, n_units)
+            window_start, window_end = self._char_of(start), self._char_of(end)
+
+            end_adj, cut = end - start, window_end
+            if end - start > min_chunk:
+                # First char position whose unit offset in the window is >= min_chunk
+                lo = self._char_of(start + min_chunk - 1) + 1 - self._base
+                for sep in _SEPARATORS:
+                    boundary = self._buf.rfind(sep, lo, window_end - self._base)
+                    if boundary != -1:
+                        cut = boundary + self._base
+                        end_adj = self._unit_of(cut) - start
+                        break
+            if end_adj <= overlap:
+                end_adj, cut = end - start, window_end
+
+            yield window_start, cut
+            start += end_adj - overlap
+            self._trim(start)
+
+    def text(self, start, end):
+        """Text of the most recently yielded span."""
+        return self._buf[start - self._base:end - self._base]
+
+
+def chunk_spans(text, chunk_size=1000, overlap=200, tokenizer=None):
+    """
+    Same chunking as chunk_text, but returns (start, end) offsets into text
+    instead of copies of the chunks.
+    """
+    return list(_ChunkStream([text], chunk_size, overlap, tokenizer).spans())
+
+
+def stream_chunks(pieces, chunk_size=1000, overlap=200, tokenizer=None):
+    """
+    Chunks an iterable of text pieces (e.g. lines of a file) lazily, holding
+    only about one window of text in memory.
+
+    Yields:
+        str: The same chunks chunk_text would return for "".join(pieces) in
+        character mode. With a tokenizer each piece is tokenized on its own,
+        so chunks only match when no token spans two pieces (e.g.
+        whitespace_tokenizer over lines kept with their line ends; not
+        guaranteed for tiktoken_tokenizer).
+    """
+    stream = _ChunkStream(pieces, chunk_size, overlap, tokenizer, trim=True)
+    for start, end in stream.spans():
+        yield stream.text(start, end)
+
+
+@traced("chunk_text", measure=lambda chunks: {"chunks": len(chunks)})
+def chunk_text(text, chunk_size=1000, overlap=200, tokenizer=None):
     """
     Splits the input text into chunks of specified size with overlap.
 
+    Chunks end at the last paragraph break, else line break, else full stop
+    that leaves at least chunk_size - overlap units in the chunk.
+
     Args:
         text (str): The input text to be chunked.
         chunk_size (int): The maximum size of each chunk.
-        overlap (int): The number of characters to overlap between chunks.
+        overlap (int): The number of characters (or tokens) to overlap between chunks.
+        tokenizer (Callable[[str], list[tuple[int, int]]]): Optional. When
+            given, chunk_size and overlap count tokens instead of characters.
 
     Returns:
         List[str]: A list of text chunks.
     """
-    if chunk_size <= 0:
-        raise ValueError("chunk_size must be greater than 0")
-    if overlap < 0:
-        raise ValueError("overlap must be non-negative")
-    
-    min_chunk = int(chunk_size - overlap)
-    chunks = []
-    start = 0
-    while start < (len(text) - overlap):
-        end = min(start + chunk_size, len(text))
-        temp_chunk = text[start:end]
-        if temp_chunk.rfind("\n\n") != -1 and temp_chunk.rfind("\n\n") >= min_chunk:
-            end_adj = temp_chunk.rfind("\n\n")
-        elif temp_chunk.rfind("\n") != -1 and temp_chunk.rfind("\n") >= min_chunk:
-            end_adj = temp_chunk.rfind("\n")
-        elif temp_chunk.rfind(".") != -1 and temp_chunk.rfind(".") >= min_chunk:
-            end_adj = temp_chunk.rfind(".")
-        else:
-            end_adj = len(temp_chunk)
-
-        if end_adj <= overlap:
-            end_adj = len(temp_chunk)
-
-        chunks.append(text[start:start + end_adj])
-        start += end_adj - overlap
-    
-    return chunks
-
-## Code used for testing of chunking behaviour
-# text =     """
-#     Splits the input text into chunks of specified size with overlap.
-
-#     Args:
-#         text (str): The input text to be chunked.
-#         chunk_size (int): The maximum size of each chunk.
-#         overlap (int): The number of characters to overlap between chunks.
-
-#     Returns:
-#         List[str]: A list of text chunks.
-#     """
-
-# print(chunk_text(text, 100, 30))
\ No newline at end of file
+    return [text[start:end] for start, end in chunk_spans(text, chunk_size, overlap, tokenizer)]
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+import httpx
+
+from config import CRAWL_META_PATH
+from tools.web_scraper import md_path, html_to_markdown
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def load_crawl_meta(meta_path=CRAWL_META_PATH):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_crawl_meta(meta, meta_path=CRAWL_META_PATH):
+    meta_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = meta_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, meta_path)
+
+
+def _write_atomic(text, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return len(text.encode("utf-8"))
+
+
+def _host(url):
+    try:
+        return urlsplit(url).netloc
+    except ValueError:
+        return ""  # malformed; fetch() records it as a failed page
+
+
+async def _get(client, url, headers, max_retries, backoff):
+    for attempt in range(max_retries + 1):
+        try:
+            response = await client.get(url, headers=headers)
+            if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else backoff * 2 ** attempt
+        except httpx.TransportError:
+            if attempt == max_retries:
+                raise
+            delay = backoff * 2 ** attempt
+        await asyncio.sleep(delay * (1 + random.random() / 2))
+
+
+async def crawl(urls, subfolder=None, max_per_host=4, max_retries=3, backoff=0.5, timeout=30.0,
+                meta_path=CRAWL_META_PATH, transport=None, convert_workers=None, html_dir=None):
+    """
+    Fetches many pages concurrently and writes each one to research/<subfolder>
+    as markdown as soon as it arrives, like fetch_page_to_md.
+
+    One pooled httpx.AsyncClient is shared by all requests, at most
+    max_per_host requests run against the same host at once, transport errors
+    and 429/5xx responses are retried with exponential backoff, and pages seen
+    before are requested conditionally (ETag / Last-Modified), so unchanged
+    pages come back as a bodyless 304 and are not rewritten.
+
+    HTML-to-markdown conversion runs in a thread, or in a pool of
+    convert_workers processes for large batches. With html_dir set, the raw
+    HTML of every fetched page is saved there as well (e.g. for benchmarks).
+
+    Returns:
+        list[dict]: One {"url", "status", "path", "bytes", "error"} per url, where
+        status is "fetched", "not_modified" or "failed" (any error fetching,
+        converting or writing a page fails just that page).
+    """
+    meta = load_crawl_meta(meta_path)
+    host_limits = {}
+    n_hosts = len({_host(url) for url in urls}) or 1
+    limits = httpx.Limits(max_connections=n_hosts * max_per_host, max_keepalive_connections=n_hosts * max_per_host)
+
+    async def fetch(client, url):
+        result = {"url": url, "status": "failed", "path": None, "bytes": 0, "error": None}
+        try:
+            path = md_path(url, subfolder)
+            result["path"] = str(path)
+            host = urlsplit(url).netloc
+            semaphore = host_limits.setdefault(host, asyncio.Semaphore(max_per_host))
+            headers = {}
+            seen = meta.get(url)
+            if seen and path.exists():
+                if seen.get("etag"):
+                    headers["If-None-Match"] = seen["etag"]
+                if seen.get("last_modified"):
+                    headers["If-Modified-Since"] = seen["last_modified"]
+            async with semaphore:
+                response = await _get(client, url, headers, max_retries, backoff)
+            if response.status_code == 304:
+                result["status"] = "not_modified"
+                return result
+            response.raise_for_status()
+            html = response.text
+            if html_dir is not None:
+                await asyncio.to_thread(_write_atomic, html, html_dir / path.with_suffix(".html").name)
+            markdown = await asyncio.get_running_loop().run_in_executor(pool, html_to_markdown, html)
+            result["bytes"] = await asyncio.to_thread(_write_atomic, markdown, path)
+            result["status"] = "fetched"
+            meta[url] = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "path": str(path),
+            }
+        except Exception as e:
+            # HTTP errors, but also bad URLs, undecodable bodies or a page the
+            # converter chokes on: one broken page must not abort the crawl
+            result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    pool = ProcessPoolExecutor(max_workers=convert_workers) if convert_workers else None
+    try:
+        async with httpx.AsyncClient(timeout=timeout, limits=limits, follow_redirects=True,
+                                     transport=transport) as client:
+            return await asyncio.gather(*(fetch(client, url) for url in urls))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        save_crawl_meta(meta, meta_path)
+
+
+def crawl_pages(urls, subfolder=None, **kwargs):
+    """Synchronous entry point for crawl."""
+    return asyncio.run(crawl(urls, subfolder=subfolder, **kwargs))
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+
+from config import MANIFEST_PATH
+from tools.local_search import iter_knowledge_base, scan_knowledge_base, read_document
+from tools.bm25_index import get_lexical_index
+from tools.chunker import chunk_text
+from tools.vector_store import get_collection, delete_from_collection, ingest_chunks
+
+
+def _hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    """
+    Loads the index manifest, which records for every collection the content
+    hash of each indexed file and of each of its chunks.
+
+    Returns:
+        dict: {collection_name: {file_key: {"hash", "mtime", "size", "chunk_size", "overlap", "chunks"}}}
+    """
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest, manifest_path=MANIFEST_PATH):
+    # Write to a temp file first so an interrupted sync never leaves a torn manifest
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def reset_manifest(collection_name, manifest_path=MANIFEST_PATH):
+    manifest = load_manifest(manifest_path)
+    if manifest.pop(collection_name, None) is not None:
+        save_manifest(manifest, manifest_path)
+
+
+def iter_chunks(path, chunk_size=1000, overlap=200):
+    """
+    Streams (id, document, metadata) triples for every chunk of every markdown
+    file under path, in the shape ingest_chunks expects.
+    """
+    for title, doc in iter_knowledge_base(path=path):
+        for i, chunk in enumerate(chunk_text(doc, chunk_size=chunk_size, overlap=overlap)):
+            yield f"{title}_{i}", chunk, {"title": title, "sub_folder": path.name, "chunk_index": i}
+
+
+def sync_collection(path, collection_name=None, chunk_size=1000, overlap=200,
+                    batch_size=128, workers=4, manifest_path=MANIFEST_PATH):
+    """
+    Incrementally brings a collection in line with the markdown files under path.
+
+    Only chunks that are new or whose content changed are embedded, chunks of
+    files that were removed (or that shrank) are deleted, files whose content
+    hash is unchanged are not re-chunked, and files whose mtime and size are
+    unchanged are not even read.
+
+    Args:
+        path (Path): The folder of markdown files to index.
+        collection_name (str): Defaults to the folder name.
+        chunk_size (int): Passed to chunk_text.
+        overlap (int): Passed to chunk_text.
+        batch_size (int): Passed to ingest_chunks.
+        workers (int): Passed to ingest_chunks.
+
+    Returns:
+        dict: Counts of "added", "updated", "deleted" and "unchanged" chunks,
+        plus the ingestion throughput reported by ingest_chunks.
+    """
+    collection_name = collection_name or path.name
+    manifest = load_manifest(manifest_path)
+    previous = manifest.get(collection_name, {})
+    # The manifest is only trustworthy if the collection it describes still exists
+    if previous and get_collection(collection_name).count() == 0:
+        previous = {}
+
+    stats = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    current = {}
+    stale_ids = []
+
+    def changed_chunks():
+        for title, file, stat in scan_knowledge_base(path):
+            old = previous.get(title)
+            same_params = old and old["chunk_size"] == chunk_size and old["overlap"] == overlap
+            if same_params and old.get("mtime") == stat.st_mtime and old.get("size") == stat.st_size:
+                current[title] = old
+                stats["unchanged"] += len(old["chunks"])
+                continue
+
+            doc = read_document(file)
+            file_hash = _hash(doc)
+            if same_params and old["hash"] == file_hash:
+                current[title] = {**old, "mtime": stat.st_mtime, "size": stat.st_size}
+                stats["unchanged"] += len(old["chunks"])
+                continue
+
+            old_chunks = old["chunks"] if old else []
+            chunks = chunk_text(doc, chunk_size=chunk_size, overlap=overlap)
+            chunk_hashes = [_hash(chunk) for chunk in chunks]
+            current[title] = {"hash": file_hash, "mtime": stat.st_mtime, "size": stat.st_size,
+                              "chunk_size": chunk_size, "overlap": overlap, "chunks": chunk_hashes}
+            stale_ids.extend(f"{title}_{i}" for i in range(len(chunks), len(old_chunks)))
+            for i, (chunk, chunk_hash) in enumerate(zip(chunks, chunk_hashes)):
+                if i < len(old_chunks) and old_chunks[i] == chunk_hash:
+                    stats["unchanged"] += 1
+                    continue
+                stats["updated" if i < len(old_chunks) else "added"] += 1
+                yield f"{title}_{i}", chunk, {"title": title, "sub_folder": path.name, "chunk_index": i}
+
+    stats.update(ingest_chunks(collection_name, changed_chunks(), batch_size=batch_size, workers=workers))
+
+    for title, old in previous.items():
+        if title not in current:
+            stale_ids.extend(f"{title}_{i}" for i in range(len(old["chunks"])))
+    if stale_ids:
+        delete_from_collection(collection_name, ids=stale_ids)
+        stats["deleted"] = len(stale_ids)
+        # Persist the lexical index along with the manifest that describes it
+        get_lexical_index(collection_name).save()
+
+    manifest[collection_name] = current
+    save_manifest(manifest, manifest_path)
+    return stats
@@ -1,9 +1,47 @@
 from pathlib import Path
 from config import RESEARCH_DIR
-def load_knowledge_base(path=RESEARCH_DIR):
-    knowledge_base = {}
+from tracing import traced
+
+
+def read_document(file):
+    with open(file, "rb") as f:
+        return f.read().decode("utf-8", errors="ignore")
+
+
+def scan_knowledge_base(path=RESEARCH_DIR):
+    """
+    Lists the markdown files under path without reading them.
+
+    Yields:
+        tuple[str, Path, os.stat_result]: The document key (path relative to
+        path, without the .md suffix, so same-named files in different
+        subfolders don't collide), the file and its stat.
+    """
     base_path = Path(path)
-    for file in base_path.glob("**/*.md"):
-        with open(file, "r", encoding="utf-8", errors="ignore") as f:
-            knowledge_base[file.stem] = f.read()
-    return knowledge_base
\ No newline at end of file
+    for file in sorted(base_path.glob("**/*.md")):
+        yield file.relative_to(base_path).with_suffix("").as_posix(), file, file.stat()
+
+
+def iter_knowledge_base(path=RESEARCH_DIR, changed_since=None, min_size=0, max_size=None):
+    """
+    Lazily yields (key, text) for every markdown file under path, one file in
+    memory at a time.
+
+    Args:
+        path (Path): The folder to scan recursively.
+        changed_since (float): Only yield files modified after this timestamp,
+            e.g. the time of the last indexing run.
+        min_size (int): Skip files smaller than this many bytes.
+        max_size (int): Skip files larger than this many bytes.
+    """
+    for key, file, stat in scan_knowledge_base(path):
+        if changed_since is not None and stat.st_mtime <= changed_since:
+            continue
+        if stat.st_size < min_size or (max_size is not None and stat.st_size > max_size):
+            continue
+        yield key, read_document(file)
+
+
+@traced("load_knowledge_base", measure=lambda kb: {"documents": len(kb)})
+def load_knowledge_base(path=RESEARCH_DIR):
+    return dict(iter_knowledge_base(path))
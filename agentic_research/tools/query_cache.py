@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+class QueryCache:
+    """
+    LRU + TTL cache of vector store query results.
+
+    Exact tier: keyed on (collection, normalized query, n_results), so repeats
+    skip both embedding and search. Semantic tier (similarity_threshold set):
+    a new query whose embedding has cosine similarity >= the threshold with a
+    cached query on the same collection and n_results reuses its results.
+
+    Every collection has a generation counter that invalidate() bumps; results
+    computed against an older generation are never stored, so a re-index
+    racing with a query cannot leave stale entries behind.
+    """
+
+    def __init__(self, maxsize=256, ttl=600, similarity_threshold=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()  # key -> (expires_at, results, unit embedding or None)
+        self._generations = {}
+        self._epoch = 0  # bumped when everything is invalidated at once
+        self._lock = threading.Lock()
+        self.hits = self.semantic_hits = self.misses = 0
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _alive(self, key, entry, now):
+        if entry[0] >= now:
+            return True
+        del self._entries[key]
+        return False
+
+    def generation(self, collection_name):
+        with self._lock:
+            return self._epoch, self._generations.get(collection_name, 0)
+
+    def lookup(self, collection_name, query, n_results, embed=None):
+        """
+        Looks a query up in the exact tier, then (if enabled and embed is
+        given) in the semantic tier.
+
+        Args:
+            embed (Callable[[str], list[float]]): Computes the query embedding,
+                only called on an exact miss.
+
+        Returns:
+            tuple: (results or None, the query embedding if it was computed),
+            so a miss can search with the embedding instead of embedding twice.
+        """
+        key = (collection_name, normalize_query(query), n_results)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._alive(key, entry, time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], None
+
+        if self.similarity_threshold is None or embed is None:
+            with self._lock:
+                self.misses += 1
+            return None, None
+
+        embedding = embed(query)
+        vector = self._unit(embedding)
+        now = time.monotonic()
+        best_key, best_score = None, self.similarity_threshold
+        with self._lock:
+            for cached_key, entry in list(self._entries.items()):
+                if cached_key[0] != collection_name or cached_key[2] != n_results or entry[2] is None:
+                    continue
+                if not self._alive(cached_key, entry, now):
+                    continue
+                score = float(np.dot(vector, entry[2]))
+                if score >= best_score:
+                    best_key, best_score = cached_key, score
+            if best_key is None:
+                self.misses += 1
+                return None, embedding
+            # Remember the new phrasing too, so repeating it is an exact hit
+            expires_at, results, _ = self._entries[best_key]
+            self._entries[key] = (expires_at, results, vector)
+            self._entries.move_to_end(best_key)
+            self._evict()
+            self.semantic_hits += 1
+            return results, embedding
+
+    def put(self, collection_name, query, n_results, results, embedding=None, generation=None):
+        key = (collection_name, normalize_query(query), n_results)
+        vector = None
+        if self.similarity_threshold is not None and embedding is not None:
+            vector = self._unit(embedding)
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(collection_name, 0)):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, results, vector)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, collection_name=None):
+        """Drops cached results for one collection, or for all of them."""
+        with self._lock:
+            if collection_name is None:
+                self._entries.clear()
+                self._epoch += 1
+                return
+            for key in [key for key in self._entries if key[0] == collection_name]:
+                del self._entries[key]
+            self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {"size": len(self._entries), "hits": self.hits,
+                    "semantic_hits": self.semantic_hits, "misses": self.misses,
+                    "hit_rate": round((self.hits + self.semantic_hits) / lookups, 3) if lookups else 0.0}
@@ -0,0 +1,105 @@
+from tools.bm25_index import get_lexical_index
+from tools.chunker import whitespace_tokenizer
+from tools.vector_store import get_collection, query_collection
+from tracing import current_span, span, traced
+
+# Reciprocal rank fusion constant; 60 is the usual choice and damps the top ranks
+RRF_K = 60
+
+
+@traced("hybrid_query")
+def hybrid_query(query, collection_name, n_results=5, candidates=20, lexical_weight=1.0):
+    """
+    Retrieves chunks by fusing dense (Chroma) and lexical (BM25) rankings.
+
+    Both retrievers return `candidates` hits, and each chunk scores
+    sum(weight / (RRF_K + rank)) over the rankings it appears in, so exact
+    term matches the embedding misses still surface.
+
+    Returns:
+        list[dict]: Up to n_results {"id", "document", "metadata", "score"},
+        best first.
+    """
+    dense = query_collection(query, collection_name, n_results=candidates)
+    index = get_lexical_index(collection_name, get_collection(collection_name))
+    with span("bm25_search"):
+        lexical = index.search(query, n_results=candidates)
+
+    scores, hits = {}, {}
+    for rank, (doc_id, document, metadata) in enumerate(
+        zip(dense["ids"][0], dense["documents"][0], dense["metadatas"][0])
+    ):
+        scores[doc_id] = 1 / (RRF_K + rank + 1)
+        hits[doc_id] = {"id": doc_id, "document": document, "metadata": metadata}
+    for rank, (doc_id, _) in enumerate(lexical):
+        scores[doc_id] = scores.get(doc_id, 0.0) + lexical_weight / (RRF_K + rank + 1)
+
+    top = sorted(scores, key=scores.get, reverse=True)[:n_results]
+    missing = [doc_id for doc_id in top if doc_id not in hits]
+    if missing:
+        fetched = get_collection(collection_name).get(ids=missing, include=["documents", "metadatas"])
+        for doc_id, document, metadata in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+            hits[doc_id] = {"id": doc_id, "document": document, "metadata": metadata}
+    return [{**hits[doc_id], "score": scores[doc_id]} for doc_id in top if doc_id in hits]
+
+
+def _merge(left, right, max_overlap=1000):
+    # Longest suffix of left that is also a prefix of right (the chunker's overlap)
+    for size in range(min(len(left), len(right), max_overlap), 0, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return left + "\n" + right
+
+
+def merge_overlapping(hits):
+    """
+    Collapses hits that are neighbouring chunks of the same document into one
+    passage, dropping the text they share, so the context doesn't repeat it.
+    Passages keep the rank of their best chunk.
+    """
+    def position(item):
+        metadata = item[1].get("metadata") or {}
+        index = metadata.get("chunk_index")
+        return str(metadata.get("title")), -1 if index is None else index, item[0]
+
+    passages, last = [], None
+    for rank, hit in sorted(enumerate(hits), key=position):
+        metadata = hit.get("metadata") or {}
+        title, index = metadata.get("title"), metadata.get("chunk_index")
+        if last is not None and index is not None and last["title"] == title and last["last_chunk"] == index - 1:
+            last["text"] = _merge(last["text"], hit["document"])
+            last["ids"].append(hit["id"])
+            last["rank"] = min(last["rank"], rank)
+            last["last_chunk"] = index
+            continue
+        last = {"title": title, "ids": [hit["id"]], "text": hit["document"], "rank": rank, "last_chunk": index}
+        passages.append(last)
+    return sorted(passages, key=lambda p: p["rank"])
+
+
+def build_context(passages, token_budget=1500, tokenizer=whitespace_tokenizer):
+    """
+    Formats passages as "[title]\ntext" blocks, best first, stopping (and
+    truncating the last block) once token_budget tokens are used. tokenizer
+    is the same (start, end) span callable chunk_text accepts.
+    """
+    blocks, used = [], 0
+    for passage in passages:
+        block = f"[{passage['title']}]\n{passage['text']}"
+        tokens = tokenizer(block)
+        if used + len(tokens) > token_budget:
+            remaining = token_budget - used
+            if remaining > 20:
+                blocks.append(block[:tokens[remaining - 1][1]])
+            break
+        blocks.append(block)
+        used += len(tokens)
+    return "\n\n---\n\n".join(blocks)
+
+
+@traced("retrieve_context")
+def retrieve_context(query, collection_name, n_results=5, token_budget=1500):
+    """Hybrid retrieval, de-duplicated and packed into a token-budgeted context string."""
+    context = build_context(merge_overlapping(hybrid_query(query, collection_name, n_results)), token_budget)
+    current_span().add("context_words", len(context.split()))
+    return context
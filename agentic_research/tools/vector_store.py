@@ -1,23 +1,192 @@
-from config import CHROMA_DIR
-import chromadb
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from config import CHROMA_DIR, QUERY_CACHE_SIZE, QUERY_CACHE_TTL, QUERY_CACHE_SIMILARITY
+from tools.query_cache import QueryCache
+from tools.bm25_index import SAVE_EVERY, get_lexical_index, drop_lexical_index
+from tracing import current_span, span, traced, tracer
 
-client = chromadb.PersistentClient(path=str(CHROMA_DIR))
+# chromadb takes ~1s to import and opening the client touches CHROMA_DIR, so
+# both happen on first use rather than when this module is imported
+_client = None
+_embedding_function = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Returns the process-wide Chroma client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import chromadb
+                _client = chromadb.PersistentClient(path=str(CHROMA_DIR))
+    return _client
+
+def embedding_function(texts):
+    # Same function collections get by default, so precomputed embeddings stay compatible
+    global _embedding_function
+    if _embedding_function is None:
+        with _client_lock:
+            if _embedding_function is None:
+                from chromadb.utils import embedding_functions
+                _embedding_function = embedding_functions.DefaultEmbeddingFunction()
+    return _embedding_function(texts)
+
+# Results are dropped whenever a collection is written to, see _written/_deleted
+query_cache = QueryCache(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL,
+                         similarity_threshold=QUERY_CACHE_SIMILARITY)
+tracer.register_collector("query_cache", query_cache.stats)
+
+# Process-wide registry of collection handles, so lookups after the first one
+# are a dict hit instead of a list_collections() round trip
+_collections = {}
+_collections_lock = threading.Lock()
+
+def invalidate_collection(collection_name=None):
+    """Drops one cached handle, or all of them when collection_name is None."""
+    with _collections_lock:
+        if collection_name is None:
+            _collections.clear()
+        else:
+            _collections.pop(collection_name, None)
 
 def delete_collection(collection_name):
-    if collection_name in [c.name for c in client.list_collections()]:
-        client.delete_collection(collection_name)
+    from chromadb.errors import NotFoundError
+    with _collections_lock:
+        _collections.pop(collection_name, None)
+        try:
+            get_client().delete_collection(collection_name)
+        except NotFoundError:
+            pass
+    drop_lexical_index(collection_name)
+    query_cache.invalidate(collection_name)
+
 def get_collection(collection_name):
-    if collection_name in [c.name for c in client.list_collections()]:
-        collection = client.get_collection(collection_name)
-    else:
-        collection = client.create_collection(collection_name)
+    collection = _collections.get(collection_name)
+    if collection is None:
+        with _collections_lock:
+            collection = _collections.get(collection_name)
+            if collection is None:
+                collection = get_client().get_or_create_collection(collection_name)
+                _collections[collection_name] = collection
     return collection
 
+# Every write keeps the collection's BM25 index in step and drops its cached query
+# results; the index file is only rewritten once SAVE_EVERY chunks changed
+def _written(collection_name, ids, documents, save=True):
+    index = get_lexical_index(collection_name, get_collection(collection_name))
+    index.add(ids, documents)
+    if save:
+        index.save(min_changes=SAVE_EVERY)
+    query_cache.invalidate(collection_name)
+
+def _deleted(collection_name, ids):
+    index = get_lexical_index(collection_name, get_collection(collection_name))
+    index.remove(ids)
+    index.save(min_changes=SAVE_EVERY)
+    query_cache.invalidate(collection_name)
+
+@traced("add_to_collection")
 def add_to_collection(collection_name,documents,ids,metadatas):
     collection = get_collection(collection_name)
     collection.add(documents=documents, ids=ids, metadatas=metadatas)
+    current_span().add("chunks", len(ids))
+    _written(collection_name, ids, documents)
+
+@traced("upsert_to_collection")
+def upsert_to_collection(collection_name,documents,ids,metadatas):
+    collection = get_collection(collection_name)
+    collection.upsert(documents=documents, ids=ids, metadatas=metadatas)
+    current_span().add("chunks", len(ids))
+    _written(collection_name, ids, documents)
 
-def query_collection(query, collection_name):
+@traced("delete_from_collection")
+def delete_from_collection(collection_name,ids):
     collection = get_collection(collection_name)
-    results = collection.query(query_texts=[f"{query}"], n_results=5)
-    return results
\ No newline at end of file
+    collection.delete(ids=ids)
+    _deleted(collection_name, ids)
+
+@traced("embed_query")
+def _embed_query(query):
+    return embedding_function([query])[0]
+
+@traced("query_collection")
+def query_collection(query, collection_name, n_results=5):
+    # Repeated (and, with the opt-in semantic tier, near-duplicate) queries skip the search
+    generation = query_cache.generation(collection_name)
+    results, embedding = query_cache.lookup(collection_name, query, n_results, embed=_embed_query)
+    if results is not None:
+        current_span().add("cache_hits")
+        return results
+    current_span().add("cache_misses")
+    collection = get_collection(collection_name)
+    if embedding is None:
+        embedding = _embed_query(query)
+    with span("chroma_search"):
+        results = collection.query(query_embeddings=[embedding], n_results=n_results)
+    query_cache.put(collection_name, query, n_results, results, embedding=embedding, generation=generation)
+    return results
+
+def _batched(iterable, batch_size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+@traced("embed_batch", measure=lambda batch: {"chunks": len(batch[0])})
+def _embed_batch(batch):
+    ids, documents, metadatas = (list(column) for column in zip(*batch))
+    return ids, embedding_function(documents), documents, metadatas
+
+@traced("ingest_chunks", measure=lambda stats: {"chunks": stats["chunks"], "bytes": stats["bytes"]})
+def ingest_chunks(collection_name, chunks, batch_size=128, workers=4):
+    """
+    Bulk-upserts a stream of chunks into a collection.
+
+    Chunks are grouped into batches, embedded in a thread pool, and written
+    through a single collection handle while later batches are still being
+    embedded, so ingestion is bound by embedding speed rather than round trips.
+
+    Args:
+        collection_name (str): The collection to write into.
+        chunks (Iterable[tuple[str, str, dict]]): (id, document, metadata) triples.
+            Consumed lazily, at most 2 * workers batches are held in memory.
+        batch_size (int): Number of chunks per embedding call and write.
+        workers (int): Number of embedding threads.
+
+    Returns:
+        dict: "chunks", "bytes", "seconds", "chunks_per_s" and "bytes_per_s".
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be greater than 0")
+    collection = get_collection(collection_name)
+    n_chunks = n_bytes = 0
+    start = time.perf_counter()
+
+    def write(future):
+        nonlocal n_chunks, n_bytes
+        ids, embeddings, documents, metadatas = future.result()
+        collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+        _written(collection_name, ids, documents, save=False)
+        n_chunks += len(ids)
+        n_bytes += sum(len(doc.encode("utf-8")) for doc in documents)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in _batched(chunks, batch_size):
+            pending.append(pool.submit(_embed_batch, batch))
+            if len(pending) >= 2 * workers:
+                write(pending.popleft())
+        while pending:
+            write(pending.popleft())
+    get_lexical_index(collection_name, collection).save()
+
+    seconds = time.perf_counter() - start
+    return {
+        "chunks": n_chunks,
+        "bytes": n_bytes,
+        "seconds": round(seconds, 3),
+        "chunks_per_s": round(n_chunks / seconds, 1) if seconds else 0.0,
+        "bytes_per_s": round(n_bytes / seconds, 1) if seconds else 0.0,
+    }
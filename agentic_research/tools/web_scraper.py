@@ -1,24 +1,98 @@
 import httpx
 from bs4 import BeautifulSoup
 import html2text
+import importlib.util
 import os
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from config import RESEARCH_DIR
+from tracing import current_span, traced
 
+def _installed(module):
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ImportError:
+        return False
+
+# Fastest parser available: selectolax (lexbor, C), then BeautifulSoup on lxml, then pure Python
+PARSE_BACKENDS = {"selectolax": "selectolax.lexbor", "lxml": "lxml", "html.parser": "html.parser"}
+PARSE_BACKEND = next(b for b, module in PARSE_BACKENDS.items() if b == "html.parser" or _installed(module))
+
+# Page chrome dropped before conversion, and where the article body usually lives
+BOILERPLATE_TAGS = ("script", "style", "noscript", "template", "nav", "header", "footer", "aside", "form", "iframe", "svg")
+MAIN_CONTENT_SELECTORS = ("main", "article", "[role=main]", "#main-content", "#content")
+
+def _main_node(html, backend):
+    if backend == "selectolax":
+        from selectolax.lexbor import LexborHTMLParser
+        tree = LexborHTMLParser(html)
+        tree.strip_tags(list(BOILERPLATE_TAGS))
+        candidates = (tree.css_first(selector) for selector in MAIN_CONTENT_SELECTORS)
+        return next((node for node in candidates if node is not None), tree.body or tree.root)
+    soup = BeautifulSoup(html, backend)
+    for tag in soup.find_all(BOILERPLATE_TAGS):
+        tag.decompose()
+    candidates = (soup.select_one(selector) for selector in MAIN_CONTENT_SELECTORS)
+    return next((node for node in candidates if node is not None), soup.body or soup)
+
+def extract_main_content(html, backend=None):
+    """
+    Returns the HTML of the page's main content element (first match of
+    MAIN_CONTENT_SELECTORS, else <body>) with BOILERPLATE_TAGS removed.
+    """
+    backend = backend or PARSE_BACKEND
+    node = _main_node(html, backend)
+    return node.html if backend == "selectolax" else str(node)
+
+def html_to_text(html, main_content=True, backend=None):
+    backend = backend or PARSE_BACKEND
+    if backend == "selectolax":
+        from selectolax.lexbor import LexborHTMLParser
+        node = _main_node(html, backend) if main_content else LexborHTMLParser(html).root
+        text = node.text(separator="\n", strip=True)
+        return "\n".join(line for line in text.split("\n") if line)
+    node = _main_node(html, backend) if main_content else BeautifulSoup(html, backend)
+    return node.get_text(separator="\n", strip=True)
+
+def _new_converter():
+    # HTML2Text keeps parser state between handle() calls, so every document
+    # gets a fresh (cheap) instance built from the same settings
+    return html2text.HTML2Text()
+
+def html_to_markdown(html, main_content=True, backend=None):
+    if main_content:
+        html = extract_main_content(html, backend)
+    return _new_converter().handle(html)
+
+def convert_many(htmls, main_content=True, backend=None, workers=None):
+    """
+    Converts many HTML documents to markdown across a process pool, since
+    parsing and conversion are CPU bound and hold the GIL.
+    """
+    htmls = list(htmls)
+    if workers == 1 or len(htmls) < 2:
+        return [html_to_markdown(html, main_content, backend) for html in htmls]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(html_to_markdown, htmls, [main_content] * len(htmls), [backend] * len(htmls),
+                             chunksize=max(1, len(htmls) // (4 * (workers or os.cpu_count() or 1)))))
+
+@traced("fetch_page")
 def fetch_page(url):
     response = httpx.get(url)
-    soup = BeautifulSoup(response.content, "html.parser")
-    text = soup.get_text(separator="\n", strip=True)   
+    text = html_to_text(response.text)
     return text
 
+def md_path(url, subfolder=None):
+    base_path = RESEARCH_DIR
+    if subfolder:
+        return base_path/f"{subfolder}/{url.split('/')[-2]}.md"
+    return base_path/f"{url.split('/')[-2]}.md"
+
+@traced("fetch_page_to_md")
 def fetch_page_to_md(url, subfolder=None):
-    h = html2text.HTML2Text()
     response = httpx.get(url)
-    markdown = h.handle(response.text)
-    base_path = Path("research")
-    if subfolder:
-        filename = base_path/f"{subfolder}/{url.split('/')[-2]}.md"
-    else:
-        filename = base_path/f"{url.split('/')[-2]}.md"
+    markdown = html_to_markdown(response.text)
+    current_span().add("bytes", len(markdown.encode("utf-8")))
+    filename = md_path(url, subfolder)
     filename.parent.mkdir(parents=True, exist_ok=True)
     with open(filename, "w", encoding="utf-8") as f:
         f.write(markdown)
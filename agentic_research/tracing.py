@@ -0,0 +1,228 @@
+# tracing.py - Lightweight spans, counters and metrics export for the RAG pipeline
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation. Counters (bytes, chunks, tokens...) are added with add()."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs", "counters", "start", "duration", "error")
+
+    def __init__(self, name, parent, attrs):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+        self.counters = {}
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+
+    def add(self, counter, value=1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "start": round(self.start, 6), "duration_ms": round(self.duration * 1000, 3),
+            "attrs": self.attrs, "counters": self.counters, "error": self.error,
+        }
+
+
+class Tracer:
+    """
+    Aggregates finished spans into per-name latency histograms and counter
+    totals, and optionally appends every span to a JSONL file.
+
+    Spans nest through a context variable, so they follow asyncio tasks and
+    asyncio.to_thread; work handed to a ThreadPoolExecutor starts a new trace.
+    """
+
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+        self._file = None
+        self._stats = {}  # span name -> {"count", "errors", "sum", "buckets"}
+        self._counters = {}  # (span name, counter) -> total
+        self._collectors = {}
+        if path:
+            self.export_jsonl(path)
+
+    def export_jsonl(self, path):
+        """Starts appending every finished span to path (one JSON object per line)."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._file = open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+    def register_collector(self, name, collect):
+        """Exports the numeric values of collect() (e.g. a cache's stats()) as <name>_<key> gauges."""
+        self._collectors[name] = collect
+
+    def _record(self, span):
+        with self._lock:
+            stats = self._stats.get(span.name)
+            if stats is None:
+                stats = self._stats[span.name] = {"count": 0, "errors": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)}
+            stats["count"] += 1
+            stats["sum"] += span.duration
+            stats["errors"] += span.error is not None
+            for i, bound in enumerate(BUCKETS):
+                if span.duration <= bound:
+                    stats["buckets"][i] += 1
+                    break
+            for counter, value in span.counters.items():
+                key = (span.name, counter)
+                self._counters[key] = self._counters.get(key, 0) + value
+            if self._file is not None:
+                self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    @contextmanager
+    def span(self, name, **attrs):
+        span = Span(name, _current.get(), attrs)
+        token = _current.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current.reset(token)
+            self._record(span)
+
+    def traced(self, name=None, measure=None):
+        """
+        Decorator running each call of a function (sync or async) in a span.
+
+        Args:
+            name (str): Span name, defaults to the function's qualified name.
+            measure (Callable): Maps the return value to a dict of counters to
+                add to the span, e.g. lambda chunks: {"chunks": len(chunks)}.
+        """
+        def decorate(fn):
+            span_name = name or fn.__qualname__
+
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name) as span:
+                        result = await fn(*args, **kwargs)
+                        if measure is not None:
+                            for counter, value in measure(result).items():
+                                span.add(counter, value)
+                        return result
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name) as span:
+                    result = fn(*args, **kwargs)
+                    if measure is not None:
+                        for counter, value in measure(result).items():
+                            span.add(counter, value)
+                    return result
+            return wrapper
+        return decorate
+
+    def summary(self):
+        """Returns {span name: {"count", "errors", "total_s", "mean_ms", "p50_ms", "p95_ms", counters...}}."""
+        with self._lock:
+            stats = {name: dict(s, buckets=list(s["buckets"])) for name, s in self._stats.items()}
+            counters = dict(self._counters)
+        result = {}
+        for name, s in sorted(stats.items(), key=lambda item: -item[1]["sum"]):
+            result[name] = {
+                "count": s["count"], "errors": s["errors"], "total_s": round(s["sum"], 4),
+                "mean_ms": round(s["sum"] / s["count"] * 1000, 3),
+                "p50_ms": _bucket_quantile(s["buckets"], s["count"], 0.5),
+                "p95_ms": _bucket_quantile(s["buckets"], s["count"], 0.95),
+            }
+        for (name, counter), value in counters.items():
+            result[name][counter] = value
+        return result
+
+    def prometheus_text(self):
+        """Renders all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            stats = {name: dict(s, buckets=list(s["buckets"])) for name, s in self._stats.items()}
+            counters = dict(self._counters)
+        lines = ["# TYPE ar_span_duration_seconds histogram"]
+        for name, s in sorted(stats.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, s["buckets"]):
+                cumulative += n
+                lines.append(f'ar_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'ar_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {s["count"]}')
+            lines.append(f'ar_span_duration_seconds_sum{{span="{name}"}} {s["sum"]:.6f}')
+            lines.append(f'ar_span_duration_seconds_count{{span="{name}"}} {s["count"]}')
+        lines.append("# TYPE ar_span_errors_total counter")
+        lines.extend(f'ar_span_errors_total{{span="{name}"}} {s["errors"]}' for name, s in sorted(stats.items()))
+        lines.append("# TYPE ar_span_counter_total counter")
+        lines.extend(f'ar_span_counter_total{{span="{name}",counter="{counter}"}} {value}'
+                     for (name, counter), value in sorted(counters.items()))
+        for collector, collect in sorted(self._collectors.items()):
+            for key, value in sorted(collect().items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE ar_{collector}_{key} gauge")
+                    lines.append(f"ar_{collector}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port=9464, host="127.0.0.1"):
+        """Serves prometheus_text() at http://host:port/metrics from a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _bucket_quantile(buckets, count, q):
+    # Upper bound of the bucket holding the q-quantile, in ms (None past the last bucket)
+    target, seen = q * count, 0
+    for bound, n in zip(BUCKETS, buckets):
+        seen += n
+        if seen >= target:
+            return bound * 1000
+    return None
+
+
+def current_span():
+    """The innermost active span, or None; use it to add counters from inside a traced function."""
+    return _current.get()
+
+
+# Process-wide tracer used by the decorators across the package
+tracer = Tracer(config.TRACE_PATH)
+span = tracer.span
+traced = tracer.traced
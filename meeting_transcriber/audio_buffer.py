@@ -0,0 +1,140 @@
+import numpy as np
+
+# Largest clock-rate correction applied while mixing. Real devices drift by
+# tens of ppm; the cap keeps timestamp jitter from being heard as pitch wobble.
+MAX_DRIFT = 0.001
+# Smoothing of the measured clock offset per writer pass (~5 s time constant at 4 passes/s)
+OFFSET_SMOOTHING = 0.05
+
+
+class RingBuffer:
+    """
+    Fixed-size single-producer/single-consumer FIFO of audio frames.
+
+    Preallocated so the audio callback never allocates, and lock-free: only the
+    producer (the PortAudio callback) advances the write counter and only the
+    consumer (the writer thread) advances the read counter, each after its copy
+    is done, so neither ever waits on the other.
+
+    The producer also publishes a shared-clock timestamp with every block, which
+    ClockAlignedSource uses to line sources up and measure their drift.
+    """
+
+    def __init__(self, capacity: int, channels: int, dtype=np.float32):
+        self._data = np.zeros((capacity, channels), dtype=dtype)
+        self.capacity = capacity
+        self.channels = channels
+        self._read = 0  # total frames read, owned by the consumer
+        self._write = 0  # total frames written, owned by the producer
+        self.overflow = 0  # frames dropped because the consumer fell a whole buffer behind
+        self.first_time: float | None = None  # shared-clock time of frame 0
+        self.clock: tuple[float, int] | None = None  # (time, frame index) of the latest block's first frame
+
+    @property
+    def available(self) -> int:
+        return self._write - self._read
+
+    @property
+    def written(self) -> int:
+        return self._write
+
+    @property
+    def consumed(self) -> int:
+        return self._read
+
+    def write(self, block: np.ndarray, timestamp: float | None = None) -> int:
+        """
+        Copies block (frames x channels) in; frames that don't fit are dropped
+        and counted. timestamp is the shared-clock time of the block's first frame.
+        """
+        write = self._write
+        if timestamp is not None:
+            if self.first_time is None:
+                self.first_time = timestamp
+            self.clock = (timestamp, write)
+        n = min(len(block), self.capacity - (write - self._read))
+        self.overflow += len(block) - n
+        start = write % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = block[:first]
+        self._data[:n - first] = block[first:n]
+        self._write = write + n  # publish only once the data is in place
+        return n
+
+    def read(self, frames: int) -> np.ndarray:
+        """Removes and returns up to frames frames (a copy, frames x channels)."""
+        read = self._read
+        n = min(frames, self._write - read)
+        start = read % self.capacity
+        first = min(n, self.capacity - start)
+        out = np.concatenate((self._data[start:start + first], self._data[:n - first]))
+        self._read = read + n
+        return out
+
+
+def downmix(block: np.ndarray) -> np.ndarray:
+    return block.mean(axis=1, dtype=np.float32) if block.ndim > 1 else block.astype(np.float32)
+
+
+class ClockAlignedSource:
+    """
+    Renders one RingBuffer onto the shared output timeline.
+
+    Output frame k is the shared-clock instant origin + k / sample_rate. The
+    source's own frame position for that instant is tracked from its block
+    timestamps, so a device that started late is padded with silence at the
+    right place, and a device whose clock runs fast or slow is resampled
+    (linear interpolation, ratio capped at 1 +- MAX_DRIFT) to stay in sync
+    instead of drifting apart over a long meeting.
+    """
+
+    def __init__(self, buffer: RingBuffer, sample_rate: int, origin: float):
+        self.buffer = buffer
+        self.sample_rate = sample_rate
+        self.origin = origin
+        self.underflow = 0  # output frames rendered as silence because the source had no data yet
+        self.ratio = 1.0
+        self._offset: float | None = None  # source frame index at output frame 0, smoothed
+        self._position: float | None = None  # source frame index of the next output frame
+        self._carry = np.zeros(1, dtype=np.float32)  # last consumed sample, for interpolation
+
+    @property
+    def drift_ppm(self) -> float:
+        return round((self.ratio - 1.0) * 1e6, 1)
+
+    def _measure_offset(self):
+        if self.buffer.clock is None:
+            return
+        time, frame = self.buffer.clock
+        offset = frame - (time - self.origin) * self.sample_rate
+        if self._offset is None:
+            self._offset = offset
+        else:
+            self._offset += OFFSET_SMOOTHING * (offset - self._offset)
+
+    def render(self, output_start: int, frames: int) -> np.ndarray:
+        """Returns frames mono samples for output frames output_start onwards."""
+        self._measure_offset()
+        if self._offset is None:
+            self.underflow += frames
+            return np.zeros(frames, dtype=np.float32)
+        if self._position is None:
+            self._position = output_start + self._offset
+
+        # Steer towards where the clock says this source should be at the end of the pass
+        target = output_start + frames + self._offset
+        ratio = (target - self._position) / frames
+        self.ratio = float(min(max(ratio, 1.0 - MAX_DRIFT), 1.0 + MAX_DRIFT))
+        positions = self._position + self.ratio * np.arange(frames)
+
+        consumed = self.buffer.consumed
+        needed = int(np.floor(positions[-1])) + 2 - consumed
+        new = downmix(self.buffer.read(max(0, min(needed, self.buffer.available))))
+        samples = np.concatenate((self._carry, new))
+        indices = np.arange(consumed - 1, consumed - 1 + len(samples))
+        out = np.interp(positions, indices, samples, left=0.0, right=0.0).astype(np.float32)
+        self.underflow += int(np.count_nonzero(positions > indices[-1]))
+
+        self._carry = samples[-1:]
+        self._position = positions[-1] + self.ratio
+        return out
@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import soundfile as sf
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    filename TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    created REAL NOT NULL,
+    duration REAL,
+    has_transcript INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS recordings_created ON recordings (created);
+CREATE INDEX IF NOT EXISTS recordings_size ON recordings (size);
+CREATE INDEX IF NOT EXISTS recordings_duration ON recordings (duration);
+"""
+
+# Sort keys accepted by page(), mapped to columns
+SORT_COLUMNS = {"created": "created", "name": "filename", "size": "size", "duration": "duration"}
+
+
+def _duration(path: Path) -> float | None:
+    # Reads only the header
+    try:
+        return round(sf.info(path).duration, 2)
+    except RuntimeError:
+        return None
+
+
+class Catalog:
+    """
+    SQLite catalog of recordings (size, duration, creation time, whether a
+    transcript exists), so listing them doesn't touch the filesystem.
+
+    The recorder and the transcription job update it as they go; sync() is
+    the fallback for files added, replaced or deleted behind its back. It only
+    rescans a directory when the directory's own mtime has changed, which
+    costs two stat() calls when nothing happened.
+    """
+
+    def __init__(self, db_path: Path, recordings_dir: Path, transcripts_dir: Path, suffixes):
+        self.db_path = db_path
+        self.recordings_dir = recordings_dir
+        self.transcripts_dir = transcripts_dir
+        self.suffixes = set(suffixes)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._seen: tuple[float, float] | None = None  # directory mtimes at the last sync
+
+    def _transcript_exists(self, filename: str) -> bool:
+        return (self.transcripts_dir / f"{Path(filename).stem}.txt").exists()
+
+    def upsert(self, path: Path, duration: float | None = None):
+        """Adds or refreshes one recording; the creation time of a known file is kept."""
+        stat = path.stat()
+        if duration is None:
+            duration = _duration(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO recordings (filename, size, mtime, created, duration, has_transcript)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (filename) DO UPDATE SET size = excluded.size, mtime = excluded.mtime,
+                       duration = excluded.duration, has_transcript = excluded.has_transcript""",
+                (path.name, stat.st_size, stat.st_mtime, stat.st_mtime, duration,
+                 self._transcript_exists(path.name)),
+            )
+
+    def set_transcript(self, filename: str, has_transcript: bool = True):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE recordings SET has_transcript = ? WHERE filename = ?",
+                               (has_transcript, filename))
+
+    def remove(self, filename: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM recordings WHERE filename = ?", (filename,))
+
+    def sync(self, skip: set[str] = frozenset(), force: bool = False) -> bool:
+        """
+        Reconciles the catalog with the directories if either changed since the
+        last sync. Files named in skip (e.g. the one being recorded) are left out.
+        Returns whether a rescan happened.
+        """
+        with self._sync_lock:
+            seen = (os.stat(self.recordings_dir).st_mtime, os.stat(self.transcripts_dir).st_mtime)
+            if seen == self._seen and not force:
+                return False
+            with self._lock:
+                known = {row["filename"]: (row["size"], row["mtime"], row["has_transcript"])
+                         for row in self._conn.execute("SELECT filename, size, mtime, has_transcript FROM recordings")}
+            transcripts = {entry.name[:-4] for entry in os.scandir(self.transcripts_dir) if entry.name.endswith(".txt")}
+            on_disk = set()
+            for entry in os.scandir(self.recordings_dir):
+                name = entry.name
+                if Path(name).suffix not in self.suffixes or name in skip:
+                    continue
+                on_disk.add(name)
+                stat = entry.stat()
+                has_transcript = Path(name).stem in transcripts
+                if known.get(name) == (stat.st_size, stat.st_mtime, has_transcript):
+                    continue
+                if name in known and known[name][:2] == (stat.st_size, stat.st_mtime):
+                    self.set_transcript(name, has_transcript)
+                else:
+                    self.upsert(self.recordings_dir / name)
+            for name in known.keys() - on_disk:
+                self.remove(name)
+            self._seen = seen
+            return True
+
+    def get(self, filename: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM recordings WHERE filename = ?", (filename,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def page(self, sort: str = "created", descending: bool = True, limit: int = 50, offset: int = 0) -> dict:
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort {sort!r}, expected one of {sorted(SORT_COLUMNS)}")
+        order = "DESC" if descending else "ASC"
+        with self._lock:
+            total = self._conn.execute("SELECT count(*) FROM recordings").fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT * FROM recordings ORDER BY {SORT_COLUMNS[sort]} {order}, filename {order} LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return {"total": total, "recordings": [dict(row) for row in rows]}
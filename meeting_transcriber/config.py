@@ -0,0 +1,32 @@
+import os
+import platform
+from pathlib import Path
+
+# External, non-synced storage (outside the git repo)
+DATA_DIR = Path.home() / "MeetingData"
+RECORDINGS_DIR = DATA_DIR / "recordings"
+TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
+PEAKS_DIR = DATA_DIR / "peaks"
+RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
+TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
+PEAKS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Storage format of recordings: "wav", "flac" (lossless, ~half the size) or
+# "opus" (lossy, a small fraction). Existing WAVs are converted in the background.
+RECORDING_FORMAT = os.getenv("RECORDING_FORMAT", "wav")
+
+# Transcription backend: "mlx" (Apple Silicon GPU) or "faster-whisper" (CTranslate2, CPU)
+_APPLE_SILICON = platform.system() == "Darwin" and platform.machine() == "arm64"
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "mlx" if _APPLE_SILICON else "faster-whisper")
+WHISPER_MODELS = {
+    "mlx": "mlx-community/whisper-large-v3-turbo",
+    "faster-whisper": "large-v3-turbo",
+}
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", WHISPER_MODELS.get(WHISPER_BACKEND, ""))
+# faster-whisper only: int8 weights keep large models fast and small on CPU
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 = CTranslate2's default
+# Chunks of one recording transcribed at once (faster-whisper; mlx has one GPU and runs them in turn)
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", str(max(1, (os.cpu_count() or 1) // 4))))
+# Language code, or unset to detect it from the first stretch of speech
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE") or None
@@ -0,0 +1,184 @@
+import abc
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from config import (TRANSCRIPTS_DIR, WHISPER_BACKEND, WHISPER_COMPUTE_TYPE, WHISPER_CPU_THREADS,
+                    WHISPER_LANGUAGE, WHISPER_MODEL, WHISPER_WORKERS)
+from vad import MODEL_SAMPLE_RATE, load_audio, split_on_silence
+
+
+class Engine(abc.ABC):
+    """
+    A loaded Whisper model. transcribe() takes a file path or a 16 kHz mono
+    float32 array and returns {"text", "language", "segments": [{"start", "end",
+    "text"}]}, calling on_segment(segment, progress) for each segment as it is
+    decoded (progress is 0..1 through the audio).
+    """
+
+    name = "base"
+    concurrency = 1  # transcribe() calls that can usefully run at once
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @abc.abstractmethod
+    def transcribe(self, audio: str | Path | np.ndarray, language: str | None = None,
+                   on_segment: Callable | None = None) -> dict:
+        ...
+
+
+class MLXEngine(Engine):
+    """mlx-whisper on the Apple Silicon GPU."""
+
+    name = "mlx"
+
+    def __init__(self, model: str):
+        super().__init__(model)
+        import mlx.core as mx
+        import mlx_whisper
+        from mlx_whisper.transcribe import ModelHolder
+
+        self._mlx_whisper = mlx_whisper
+        # mlx_whisper keeps the last model it loaded; loading it here makes the
+        # first transcription as fast as the rest
+        ModelHolder.get_model(model, mx.float16)
+        # One GPU: concurrent calls would only contend for it
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, language=None, on_segment=None):
+        if isinstance(audio, Path):
+            audio = str(audio)
+        with self._lock:
+            result = self._mlx_whisper.transcribe(audio, path_or_hf_repo=self.model, language=language)
+        segments = [{"start": s["start"], "end": s["end"], "text": s["text"].strip()} for s in result["segments"]]
+        if on_segment is not None:
+            for i, segment in enumerate(segments, 1):
+                on_segment(segment, i / len(segments))
+        return {"text": result["text"].strip(), "language": result.get("language"), "segments": segments}
+
+
+class FasterWhisperEngine(Engine):
+    """faster-whisper (CTranslate2) on the CPU, int8 by default."""
+
+    name = "faster-whisper"
+
+    def __init__(self, model: str, compute_type: str = WHISPER_COMPUTE_TYPE, cpu_threads: int = WHISPER_CPU_THREADS,
+                 num_workers: int = WHISPER_WORKERS):
+        super().__init__(model)
+        from faster_whisper import WhisperModel
+
+        # num_workers model replicas let that many threads transcribe in parallel
+        self.concurrency = num_workers
+        self._model = WhisperModel(model, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads,
+                                   num_workers=num_workers)
+
+    def transcribe(self, audio, language=None, on_segment=None):
+        if isinstance(audio, Path):
+            audio = str(audio)
+        # Segments are decoded lazily, so progress is reported as the audio is processed
+        pieces, info = self._model.transcribe(audio, language=language)
+        segments = []
+        for piece in pieces:
+            segment = {"start": piece.start, "end": piece.end, "text": piece.text.strip()}
+            segments.append(segment)
+            if on_segment is not None:
+                on_segment(segment, min(1.0, piece.end / info.duration) if info.duration else 1.0)
+        text = " ".join(segment["text"] for segment in segments if segment["text"])
+        return {"text": text, "language": info.language, "segments": segments}
+
+
+BACKENDS = {engine.name: engine for engine in (MLXEngine, FasterWhisperEngine)}
+
+_engines: dict[tuple[str, str], Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(backend: str = WHISPER_BACKEND, model: str = WHISPER_MODEL) -> Engine:
+    """Returns the engine for backend/model, loading the model once per process."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend {backend!r}, expected one of {sorted(BACKENDS)}")
+    key = (backend, model)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = BACKENDS[backend](model)
+        return engine
+
+
+def _timestamp(seconds: float) -> str:
+    ms = int(round(seconds * 1000))
+    return f"{ms // 3_600_000:02d}:{ms // 60_000 % 60:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+
+
+def to_vtt(segments: list[dict]) -> str:
+    cues = [f"{_timestamp(s['start'])} --> {_timestamp(s['end'])}\n{s['text']}" for s in segments]
+    return "WEBVTT\n\n" + "".join(cue + "\n\n" for cue in cues)
+
+
+def place_segments(result: dict, start: int, end: int) -> list[dict]:
+    """A chunk's segments moved onto the recording's timeline; start/end are the chunk's samples."""
+    offset, limit = start / MODEL_SAMPLE_RATE, end / MODEL_SAMPLE_RATE
+    return [{"start": round(offset + piece["start"], 2), "end": round(min(offset + piece["end"], limit), 2),
+             "text": piece["text"]} for piece in result["segments"] if piece["text"]]
+
+
+def save_transcript(stem: str, segments: list[dict], language: str | None, duration: float, speech: float,
+                    transcripts_dir: Path = TRANSCRIPTS_DIR) -> dict:
+    """Writes <stem>.txt, <stem>.json and <stem>.vtt to transcripts_dir; returns the transcript."""
+    text = " ".join(segment["text"] for segment in segments)
+    transcript = {
+        "text": text,
+        "language": language,
+        "duration": round(duration, 2),
+        "speech": round(speech, 2),
+        "segments": segments,
+    }
+    (transcripts_dir / f"{stem}.txt").write_text(text)
+    (transcripts_dir / f"{stem}.json").write_text(json.dumps(transcript))
+    (transcripts_dir / f"{stem}.vtt").write_text(to_vtt(segments))
+    return transcript
+
+
+def transcribe_file(audio_path: Path, on_segment: Callable | None = None, engine: Engine | None = None) -> dict:
+    """
+    Transcribes a recording and saves <stem>.txt, <stem>.json (timestamped
+    segments) and <stem>.vtt to TRANSCRIPTS_DIR.
+
+    Silence is skipped: the audio is split into speech chunks (see vad.py),
+    which run engine.concurrency at a time and are stitched back together on
+    the recording's timeline. on_segment(segment, progress) sees segments in
+    order, progress being the fraction of speech transcribed.
+    """
+    engine = engine or get_engine()
+    audio = load_audio(audio_path)
+    chunks = split_on_silence(audio)
+    total = sum(end - start for start, end in chunks)
+    language = WHISPER_LANGUAGE
+
+    def run(chunk):
+        start, end = chunk
+        return engine.transcribe(audio[start:end], language=language)
+
+    # Without a configured language the first chunk detects it for the rest,
+    # so short chunks can't each guess differently
+    results = [run(chunks[0])] if chunks and language is None else []
+    if results:
+        language = results[0]["language"]
+
+    segments, done = [], 0
+    with ThreadPoolExecutor(max_workers=engine.concurrency) as pool:
+        for (start, end), result in zip(chunks, chain(results, pool.map(run, chunks[len(results):]))):
+            done += end - start
+            for segment in place_segments(result, start, end):
+                segments.append(segment)
+                if on_segment is not None:
+                    on_segment(segment, done / total)
+
+    return save_transcript(audio_path.stem, segments, language, len(audio) / MODEL_SAMPLE_RATE,
+                           total / MODEL_SAMPLE_RATE)
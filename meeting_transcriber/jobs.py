@@ -0,0 +1,181 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+# Job states; "running" jobs found at startup were interrupted and are queued again
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority DESC, id);
+"""
+
+
+class JobQueue:
+    """
+    Persistent transcription queue backed by a SQLite table.
+
+    Jobs run on a fixed pool of worker threads, highest priority first, so at
+    most `workers` transcriptions (and model copies) are ever active. Submitting
+    a file that already has a queued or running job returns that job instead of
+    adding another. Jobs left queued or running when the server stopped are
+    picked up again by start().
+
+    run(filename, report) does the work; it may call report(progress, segment)
+    with a 0..1 progress and a finished segment dict as it goes, which pollers
+    see as progress and partial segments.
+    """
+
+    def __init__(self, db_path: Path, run: Callable, workers: int = 1, name: str = "transcribe"):
+        self.db_path = db_path
+        self.name = name
+        self._run = run
+        self.workers = workers
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._segments: dict[int, list[dict]] = {}  # partial segments of running jobs
+        self._threads: list[threading.Thread] = []
+        self._stopping = False
+        self._version = 0  # bumped on every change, lets watchers skip unchanged polls
+
+    def start(self):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, started = NULL, progress = 0 WHERE status = ?",
+                               (QUEUED, RUNNING))
+            self._conn.commit()
+            self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"{self.name}-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float | None = None):
+        """Stops taking new jobs; running ones finish (or are resumed on next start)."""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _job(self, row) -> dict | None:
+        if row is None:
+            return None
+        job = dict(row)
+        job["segments"] = list(self._segments.get(job["id"], []))
+        return job
+
+    def submit(self, filename: str, priority: int = 0) -> dict:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE filename = ? AND status IN (?, ?)",
+                                     (filename, QUEUED, RUNNING)).fetchone()
+            if row is not None:
+                if priority > row["priority"]:
+                    self._conn.execute("UPDATE jobs SET priority = ? WHERE id = ?", (priority, row["id"]))
+                    self._conn.commit()
+                    row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                return self._job(row)
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (filename, priority, status, created) VALUES (?, ?, ?, ?)",
+                (filename, priority, QUEUED, time.time()),
+            )
+            self._conn.commit()
+            self._version += 1
+            self._wakeup.notify()
+            return self._job(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (cursor.lastrowid,)).fetchone())
+
+    def get(self, job_id: int) -> dict | None:
+        with self._lock:
+            return self._job(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def latest(self, filename: str) -> dict | None:
+        with self._lock:
+            return self._job(self._conn.execute(
+                "SELECT * FROM jobs WHERE filename = ? ORDER BY id DESC LIMIT 1", (filename,)).fetchone())
+
+    def list(self, status: str | None = None, limit: int = 100) -> list[dict]:
+        with self._lock:
+            if status:
+                rows = self._conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?",
+                                          (status, limit)).fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+            return [self._job(row) for row in rows]
+
+    def active(self) -> dict[str, dict]:
+        """Queued and running jobs by filename."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)).fetchall()
+            return {row["filename"]: self._job(row) for row in rows}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _claim(self) -> dict | None:
+        # Called with the lock held
+        row = self._conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY priority DESC, id LIMIT 1",
+                                 (QUEUED,)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE jobs SET status = ?, started = ? WHERE id = ?", (RUNNING, time.time(), row["id"]))
+        self._conn.commit()
+        self._segments[row["id"]] = []
+        self._version += 1
+        return dict(row)
+
+    def _finish(self, job_id: int, status: str, error: str | None = None):
+        with self._lock:
+            progress = ", progress = 1" if status == DONE else ""
+            self._conn.execute(f"UPDATE jobs SET status = ?, error = ?, finished = ?{progress} WHERE id = ?",
+                               (status, error, time.time(), job_id))
+            self._conn.commit()
+            self._segments.pop(job_id, None)
+            self._version += 1
+
+    def _work(self):
+        while True:
+            job = None
+            with self._lock:
+                while not self._stopping and (job := self._claim()) is None:
+                    self._wakeup.wait()
+            if job is None:
+                return
+            job_id = job["id"]
+
+            def report(progress: float, segment: dict | None = None):
+                with self._lock:
+                    self._conn.execute("UPDATE jobs SET progress = ? WHERE id = ?", (round(progress, 4), job_id))
+                    self._conn.commit()
+                    if segment is not None:
+                        self._segments[job_id].append(segment)
+                    self._version += 1
+
+            try:
+                self._run(job["filename"], report)
+            except Exception as e:
+                self._finish(job_id, FAILED, f"{type(e).__name__}: {e}")
+            else:
+                self._finish(job_id, DONE)
+
+
+def job_event(job: dict) -> str:
+    """Formats a job as a server-sent event."""
+    return f"event: job\ndata: {json.dumps(job)}\n\n"
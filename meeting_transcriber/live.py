@@ -0,0 +1,200 @@
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from config import TRANSCRIPTS_DIR, WHISPER_LANGUAGE
+from engine import Engine, get_engine, place_segments, save_transcript
+from vad import (FRAME_SECONDS, MAX_CHUNK_SECONDS, MIN_SILENCE_SECONDS, MODEL_SAMPLE_RATE, PAD_SECONDS, Resampler,
+                 frame_levels, plan_chunks, speech_regions)
+
+STEP_SECONDS = 1.0  # how often the window is re-transcribed while speech continues
+MIN_PARTIAL_SECONDS = 1.0  # shorter unfinished speech isn't worth a partial pass
+FINAL_ATTEMPTS = 3  # tries at the last pass, which has no next pass to retry it
+
+_FRAME = int(FRAME_SECONDS * MODEL_SAMPLE_RATE)
+
+
+class LiveTranscriber:
+    """
+    Transcribes a recording while it is being made.
+
+    The recorder hands every mixed block to feed() (from its writer thread,
+    so that only queues the block). A worker thread keeps a window of the
+    audio not yet finalized and, every STEP_SECONDS:
+
+    - finalizes each stretch of speech once a pause (MIN_SILENCE_SECONDS)
+      shows it has ended, or once the window reaches MAX_CHUNK_SECONDS (cut
+      at its quietest point, as vad.plan_chunks does), and drops it from the
+      window; silence is dropped without being transcribed;
+    - re-transcribes the unfinished speech at the end of the window as
+      partial segments, replaced on every pass.
+
+    finish() transcribes what is left and saves the transcript like
+    transcribe_file does, so only the last few seconds are outstanding when
+    the recording stops. If that still fails after FINAL_ATTEMPTS, on_error
+    is called so the caller can transcribe the saved file instead. Watchers
+    poll snapshot() (see version).
+    """
+
+    def __init__(self, sample_rate: int, engine: Engine | None = None, language: str | None = WHISPER_LANGUAGE,
+                 on_done: Callable | None = None, on_error: Callable | None = None,
+                 transcripts_dir: Path = TRANSCRIPTS_DIR):
+        self._resampler = Resampler(sample_rate)
+        self._engine = engine
+        self.language = language
+        self._on_done = on_done  # called with (path, transcript) once the final transcript is saved
+        self._on_error = on_error  # called with (path, error) if it can't be
+        self.transcripts_dir = transcripts_dir
+        self._lock = threading.Lock()
+        self._blocks: list[np.ndarray] = []  # fed but not yet taken by the worker
+        self._audio = np.zeros(0, dtype=np.float32)  # 16 kHz window, starting at sample self._base
+        self._base = 0
+        self._speech = 0  # samples sent to the model as final chunks
+        self.segments: list[dict] = []  # final
+        self.partial: list[dict] = []
+        self.path: Path | None = None
+        self.transcript: dict | None = None
+        self.error: str | None = None
+        self.done = False
+        self.version = 0
+        self.finished_at: float | None = None
+        self._cancelled = False
+        self._finish = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="live-transcriber", daemon=True)
+        self._thread.start()
+
+    def feed(self, mix: np.ndarray):
+        with self._lock:
+            self._blocks.append(mix)
+
+    def finish(self, path: Path):
+        """The recording was saved to path: finalize the rest and save the transcript."""
+        self.path = path
+        self._finish.set()
+
+    def cancel(self):
+        """The recording was discarded: stop without saving anything."""
+        self._cancelled = True
+        self._finish.set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        self._thread.join(timeout)
+        return self.done
+
+    def snapshot(self, since: int = 0) -> dict:
+        """Final segments from index since on, the current partial ones and whether it's done."""
+        with self._lock:
+            return {
+                "filename": self.path.name if self.path else None,
+                "final": self.segments[since:],
+                "finals": len(self.segments),
+                "partial": list(self.partial),
+                "done": self.done,
+                "error": self.error,
+            }
+
+    def _take(self):
+        with self._lock:
+            blocks, self._blocks = self._blocks, []
+        if blocks:
+            resampled = self._resampler.process(np.concatenate(blocks))
+            self._audio = np.concatenate((self._audio, resampled))
+
+    def _transcribe(self, start: int, end: int) -> list[dict]:
+        # start/end are window samples; returns segments on the recording's timeline
+        self._engine = self._engine or get_engine()
+        result = self._engine.transcribe(self._audio[start:end], language=self.language)
+        if self.language is None:
+            self.language = result["language"]  # detected once, then kept for the rest
+        return place_segments(result, self._base + start, self._base + end)
+
+    def _publish(self, final: list[dict], partial: list[dict]):
+        with self._lock:
+            self.segments.extend(final)
+            self.partial = partial
+            self.error = None
+            self.version += 1
+
+    def _step(self, last: bool):
+        if self._cancelled:
+            return
+        self._take()
+        levels = frame_levels(self._audio)
+        regions = speech_regions(levels)
+        max_frames = int(MAX_CHUNK_SECONDS / FRAME_SECONDS)
+
+        if last:
+            commit = len(levels)
+        else:
+            # A region is over once MIN_SILENCE_SECONDS of quiet follow it
+            pause = int((MIN_SILENCE_SECONDS - PAD_SECONDS) / FRAME_SECONDS)
+            ended = [end for _, end in regions if end + pause <= len(levels)]
+            # Without speech, the last second stays in case it is the start of some
+            onset = int((MIN_PARTIAL_SECONDS + PAD_SECONDS) / FRAME_SECONDS)
+            commit = ended[-1] if ended else (0 if regions else max(0, len(levels) - onset))
+            if len(levels) - commit > max_frames:
+                # Nobody paused for a whole window: cut where it's quietest
+                window = levels[commit + max_frames // 2:commit + max_frames]
+                commit = commit + max_frames // 2 + int(np.argmin(window))
+
+        final, speech = [], 0
+        finished = [(start, min(end, commit)) for start, end in regions if start < commit]
+        for start, end in plan_chunks(finished, levels, max_frames):
+            final += self._transcribe(start * _FRAME, end * _FRAME)
+            speech += (end - start) * _FRAME
+
+        partial = []
+        unfinished = [(max(start, commit), end) for start, end in regions if end > commit]
+        if unfinished and not last:
+            start, end = unfinished[0][0], unfinished[-1][1]
+            if (end - start) * FRAME_SECONDS >= MIN_PARTIAL_SECONDS:
+                partial = self._transcribe(start * _FRAME, min(len(self._audio), end * _FRAME))
+
+        # Only now that every pass succeeded: drop what's been finalized (or
+        # was silence) from the window; a failed step leaves it all for the retry
+        cut = min(commit * _FRAME, len(self._audio))
+        self._audio = self._audio[cut:]
+        self._base += cut
+        self._speech += speech
+        self._publish(final, partial)
+
+    def _try_step(self, last: bool):
+        try:
+            self._step(last)
+        except Exception as e:
+            # The window is kept, so the next pass retries it
+            with self._lock:
+                self.error = f"{type(e).__name__}: {e}"
+                self.version += 1
+
+    def _run(self):
+        last = False
+        while not last:
+            last = self._finish.wait(STEP_SECONDS)
+            self._try_step(last)
+        for _ in range(FINAL_ATTEMPTS - 1):
+            if self.error is None or self._cancelled:
+                break
+            self._try_step(True)
+        try:
+            if self.error is None and not self._cancelled:
+                self.transcript = save_transcript(self.path.stem, self.segments, self.language,
+                                                  (self._base + len(self._audio)) / MODEL_SAMPLE_RATE,
+                                                  self._speech / MODEL_SAMPLE_RATE, self.transcripts_dir)
+                if self._on_done is not None:
+                    self._on_done(self.path, self.transcript)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        if self.transcript is None and not self._cancelled and self._on_error is not None:
+            try:
+                self._on_error(self.path, self.error)
+            except Exception as e:
+                self.error = f"{self.error}; {type(e).__name__}: {e}"
+        with self._lock:
+            self.partial = []
+            self.done = True
+            self.finished_at = time.monotonic()
+            self.version += 1
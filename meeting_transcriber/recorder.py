@@ -0,0 +1,239 @@
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from audio_buffer import ClockAlignedSource, RingBuffer
+from storage import FORMATS, OPUS_SAMPLE_RATES
+
+BUFFER_SECONDS = 10  # per-device ring capacity; the writer only has to keep up on average
+WRITE_INTERVAL = 0.25  # seconds between writer passes
+STALL_SECONDS = 2.0  # a device silent for this long no longer holds the mix back
+
+
+class Recorder:
+    """
+    Captures one or two input devices in parallel and streams their mono mix to disk.
+
+    Audio callbacks only copy each block, with a shared-clock timestamp, into a
+    preallocated per-device ring buffer. A writer thread drains the rings every
+    WRITE_INTERVAL, aligns the devices on that clock (see ClockAlignedSource),
+    mixes and appends to the output file, so memory stays bounded however long
+    the meeting runs and stop() only has to flush the last few seconds.
+
+    stream_factory and query_devices default to sounddevice's; pass stand-ins
+    (same signatures) to drive the recorder with synthetic signals. on_saved,
+    if given, is called with the path and duration of every finished recording.
+    A listener passed to start() receives each mixed block as it is written.
+    """
+
+    def __init__(self, recordings_dir: Path, sample_rate: int = 48000, file_format: str = "wav",
+                 stream_factory=None, query_devices=None, clock=time.monotonic, on_saved=None):
+        if file_format not in FORMATS:
+            raise ValueError(f"Unsupported format {file_format!r}, expected one of {sorted(FORMATS)}")
+        if file_format == "opus" and sample_rate not in OPUS_SAMPLE_RATES:
+            raise ValueError(f"Opus can't record at {sample_rate} Hz, expected one of {sorted(OPUS_SAMPLE_RATES)}")
+        self.recordings_dir = recordings_dir
+        self.sample_rate = sample_rate
+        self.file_format = file_format
+        if stream_factory is None or query_devices is None:
+            # Only needed for real devices; needs PortAudio
+            import sounddevice as sd
+            stream_factory = stream_factory or sd.InputStream
+            query_devices = query_devices or sd.query_devices
+        self._stream_factory = stream_factory
+        self._query_devices = query_devices
+        self._clock = clock
+        self._on_saved = on_saved
+        self._lock = threading.Lock()
+        self._streams: list = []
+        self._buffers: list[RingBuffer] = []
+        self._sources: list[ClockAlignedSource] = []
+        self._origin = 0.0
+        self._gain = 1.0  # mix gain, see _drain
+        self._file: sf.SoundFile | None = None
+        self._writer: threading.Thread | None = None
+        self._stop_writing = threading.Event()
+        self._listener = None
+        self.recording = False
+        self.start_time: float | None = None
+        self.name: str | None = None
+        self.path: Path | None = None
+        self.frames_written = 0
+
+    def _make_callback(self, buffer: RingBuffer):
+        def callback(indata, frames, time_info, status):
+            now = self._clock()
+            # Capture time of the block's first frame: PortAudio reports how long
+            # ago the ADC produced it, otherwise assume it just arrived
+            adc_time = getattr(time_info, "inputBufferAdcTime", 0.0)
+            current_time = getattr(time_info, "currentTime", 0.0)
+            age = current_time - adc_time if adc_time and current_time else frames / self.sample_rate
+            # indata is reused by PortAudio; write() copies it into the ring
+            buffer.write(indata, now - age)
+        return callback
+
+    def _out_path(self, name: str) -> Path:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        safe = "".join(c if c.isalnum() or c in "-_ " else "_" for c in name).strip()
+        return self.recordings_dir / f"{stamp}_{safe}.{self.file_format}"
+
+    def start(self, devices: list[int], name: str | None, listener=None):
+        with self._lock:
+            if self.recording:
+                raise RuntimeError("Already recording")
+            self._listener = listener
+            self._streams = []
+            self._buffers = []
+            self._sources = []
+            try:
+                self._open(devices, name)
+                self._stop_writing.clear()
+                self._writer = threading.Thread(target=self._write_loop, name="recorder-writer", daemon=True)
+                self._writer.start()
+                # Output frame 0 is this instant; every device is placed relative to it
+                origin = self._clock()
+                self._sources = [ClockAlignedSource(buffer, self.sample_rate, origin) for buffer in self._buffers]
+                self._origin = origin
+                # Start all streams as close together as possible
+                for stream in self._streams:
+                    stream.start()
+            except Exception:
+                self._abort_start()
+                raise
+            self.recording = True
+            self.start_time = time.time()
+
+    def _open(self, devices: list[int], name: str | None):
+        for dev in devices:
+            info = self._query_devices(dev)
+            channels = min(2, int(info["max_input_channels"]))
+            if channels < 1:
+                raise RuntimeError(f"Device {dev} has no input channels")
+            buffer = RingBuffer(BUFFER_SECONDS * self.sample_rate, channels)
+            stream = self._stream_factory(
+                device=dev,
+                samplerate=self.sample_rate,
+                channels=channels,
+                dtype="float32",
+                callback=self._make_callback(buffer),
+            )
+            self._buffers.append(buffer)
+            self._streams.append(stream)
+
+        self.name = name or "meeting"
+        self.path = self._out_path(self.name)
+        container, subtype = FORMATS[self.file_format]
+        self._file = sf.SoundFile(self.path, "w", samplerate=self.sample_rate, channels=1,
+                                  format=container, subtype=subtype)
+        self.frames_written = 0
+        self._gain = 1.0
+
+    def _abort_start(self):
+        # Undo a start() that failed partway: nothing may keep running or writing
+        self._close_streams()
+        if self._writer is not None:
+            self._stop_writing.set()
+            self._writer.join()
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self.path.unlink(missing_ok=True)
+            self._file = None
+        self._buffers = []
+        self._sources = []
+        self._origin = 0.0
+        self._listener = None
+
+    def _close_streams(self):
+        for stream in self._streams:
+            stream.stop()
+            stream.close()
+        self._streams = []
+
+    def _write_loop(self):
+        while not self._stop_writing.wait(WRITE_INTERVAL):
+            self._drain()
+        self._drain(final=True)
+
+    def _delivered_until(self, buffer: RingBuffer) -> float | None:
+        # Shared-clock time up to which this device has delivered audio
+        if buffer.clock is None:
+            return None
+        time, frame = buffer.clock
+        return time + (buffer.written - frame) / self.sample_rate
+
+    def _drain(self, final: bool = False):
+        delivered = [t for t in map(self._delivered_until, self._buffers) if t is not None]
+        if not delivered:
+            return
+        # Mix up to the instant every live device has reached; a device that
+        # stalled (e.g. unplugged) is rendered as silence rather than holding
+        # the others back, and the final flush takes everything
+        live = [t for t in delivered if t > self._clock() - STALL_SECONDS]
+        until = max(delivered) if final or not live else min(live)
+        frames = int((until - self._origin) * self.sample_rate) - self.frames_written
+        if frames <= 0:
+            return
+        mix = np.zeros(frames, dtype=np.float32)
+        for source in self._sources:
+            mix += source.render(self.frames_written, frames)
+        # Prevent clipping. Without the whole recording there is no global
+        # peak to normalise by, so the gain follows the loudest peak so far:
+        # it only ever falls, i.e. from the first loud passage on this is
+        # normalising by the global peak, without a limiter's pumping
+        peak = float(np.max(np.abs(mix)))
+        if peak * self._gain > 1.0:
+            self._gain = 1.0 / peak
+        if self._gain < 1.0:
+            mix *= self._gain
+        self._file.write(mix)
+        self._file.flush()
+        self.frames_written += frames
+        if self._listener is not None:
+            self._listener(mix)
+
+    def stop(self) -> Path:
+        with self._lock:
+            if not self.recording:
+                raise RuntimeError("Not recording")
+            self._close_streams()
+            self._stop_writing.set()
+            self._writer.join()
+            self._file.close()
+            path, frames = self.path, self.frames_written
+            self.recording = False
+            self.start_time = None
+            self._buffers = []
+            self._sources = []
+            self._file = None
+            self._writer = None
+            self._listener = None
+
+        if frames == 0:
+            path.unlink(missing_ok=True)
+            raise RuntimeError("No audio was captured")
+        if self._on_saved is not None:
+            self._on_saved(path, frames / self.sample_rate)
+        return path
+
+    def status(self) -> dict:
+        elapsed = time.time() - self.start_time if self.recording and self.start_time else 0
+        return {
+            "recording": self.recording,
+            "elapsed": round(elapsed, 1),
+            "name": self.name,
+            "written": round(self.frames_written / self.sample_rate, 1),
+            "devices": [
+                {
+                    "buffered": round(source.buffer.available / self.sample_rate, 2),
+                    "overflow": source.buffer.overflow,
+                    "underflow": source.underflow,
+                    "drift_ppm": source.drift_ppm,
+                }
+                for source in self._sources
+            ],
+        }
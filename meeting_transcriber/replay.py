@@ -0,0 +1,136 @@
+"""
+Replays audio files through the recorder and live transcriber as if they were
+input devices, to try live transcription without a meeting (or a sound card).
+
+    uv run python replay.py meeting.wav [system.wav] [--speed 4]
+
+Each file stands in for one device. Prints segments as they are finalized and
+how long after stop the transcript was ready. Output goes to a temporary
+directory, not ~/MeetingData.
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+BLOCK_SECONDS = 0.02  # callback size, like a real input stream
+
+
+class ReplayStream:
+    """Feeds a file to a recorder callback at (speed x) real time; the parts of sd.InputStream Recorder uses."""
+
+    def __init__(self, replay: "Replay", path: Path, samplerate: int, channels: int, callback):
+        self.replay = replay
+        self.path = path
+        self.samplerate = samplerate
+        self.channels = channels
+        self.callback = callback
+        self.finished = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"replay-{self.path.name}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        blocksize = int(BLOCK_SECONDS * self.samplerate)
+        started, frames = time.monotonic(), 0
+        with sf.SoundFile(self.path) as f:
+            for block in f.blocks(blocksize=blocksize, dtype="float32", always_2d=True):
+                if self._stop.is_set():
+                    break
+                block = block[:, :self.channels]
+                self.callback(np.ascontiguousarray(block), len(block), None, None)
+                frames += len(block)
+                delay = started + frames / self.samplerate / self.replay.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        self.finished.set()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        pass
+
+
+class Replay:
+    """stream_factory, query_devices and clock for a Recorder, one device per file."""
+
+    def __init__(self, paths: list[Path], speed: float = 1.0):
+        self.paths = paths
+        self.speed = speed
+        self.infos = [sf.info(path) for path in paths]
+        self.streams: list[ReplayStream] = []
+        self._origin = time.monotonic()
+
+    def clock(self) -> float:
+        # Replayed time, so the recorder's clock agrees with the audio at any speed
+        return self._origin + (time.monotonic() - self._origin) * self.speed
+
+    def query_devices(self, device: int) -> dict:
+        return {"name": self.paths[device].name, "max_input_channels": self.infos[device].channels}
+
+    def stream(self, device: int, samplerate: int, channels: int, dtype: str, callback) -> ReplayStream:
+        if self.infos[device].samplerate != samplerate:
+            raise ValueError(f"{self.paths[device].name} is {self.infos[device].samplerate} Hz, expected {samplerate}")
+        stream = ReplayStream(self, self.paths[device], samplerate, channels, callback)
+        self.streams.append(stream)
+        return stream
+
+    def wait(self):
+        for stream in self.streams:
+            stream.finished.wait()
+
+
+def _fmt(seconds: float) -> str:
+    return f"{int(seconds // 60):02d}:{seconds % 60:04.1f}"
+
+
+def main():
+    from live import LiveTranscriber
+    from recorder import Recorder
+
+    parser = argparse.ArgumentParser(description="Replay audio files through live transcription.")
+    parser.add_argument("files", type=Path, nargs="+", help="One file per device (at most two)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay this many times faster than real time")
+    args = parser.parse_args()
+
+    replay = Replay(args.files[:2], args.speed)
+    out_dir = Path(tempfile.mkdtemp(prefix="replay_"))
+    sample_rate = replay.infos[0].samplerate
+    recorder = Recorder(out_dir, sample_rate, stream_factory=replay.stream, query_devices=replay.query_devices,
+                        clock=replay.clock)
+    live = LiveTranscriber(sample_rate, transcripts_dir=out_dir)
+
+    print(f"Replaying {', '.join(path.name for path in replay.paths)} at {args.speed}x")
+    recorder.start(list(range(len(replay.paths))), "replay", listener=live.feed)
+    shown = 0
+    while not all(stream.finished.is_set() for stream in replay.streams):
+        snapshot = live.snapshot(shown)
+        for segment in snapshot["final"]:
+            print(f"[{_fmt(segment['start'])}] {segment['text']}")
+        shown = snapshot["finals"]
+        time.sleep(0.2)
+
+    stopped = time.monotonic()
+    path = recorder.stop()
+    live.finish(path)
+    live.wait()
+    for segment in live.snapshot(shown)["final"]:
+        print(f"[{_fmt(segment['start'])}] {segment['text']}")
+    if live.error:
+        print(f"Error: {live.error}")
+    print(f"\nTranscript ready {live.finished_at - stopped:.2f} s after stop: {out_dir / (path.stem + '.txt')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import html
+import json
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+# Segments live in a plain table (indexed by transcript, so replacing one
+# transcript doesn't scan the others); segments_fts indexes their text and is
+# kept in step by the triggers.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    stem TEXT NOT NULL,
+    start REAL,
+    "end" REAL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_stem ON segments (stem);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text, content = 'segments', content_rowid = 'id', tokenize = 'porter unicode61', prefix = '2 3'
+);
+CREATE TRIGGER IF NOT EXISTS segments_insert AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_delete AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts (segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TABLE IF NOT EXISTS transcripts (
+    stem TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    segments INTEGER NOT NULL
+);
+"""
+
+# Snippet highlight markers; swapped for <mark> after the text is HTML-escaped
+_OPEN, _CLOSE = "\x02", "\x03"
+
+
+def _match_expression(query: str) -> str | None:
+    # Plain words, all required; the last one also matches as a prefix so
+    # results show up while typing. FTS5 operators in the input are ignored.
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def load_segments(transcripts_dir: Path, stem: str) -> list[dict]:
+    """A transcript's timestamped segments, or its text as one untimed segment for older transcripts."""
+    segments_path = transcripts_dir / f"{stem}.json"
+    if segments_path.exists():
+        return json.loads(segments_path.read_text())["segments"]
+    text = (transcripts_dir / f"{stem}.txt").read_text().strip()
+    return [{"start": None, "end": None, "text": text}] if text else []
+
+
+class TranscriptIndex:
+    """
+    SQLite FTS5 index of transcript segments, one row per segment so hits
+    carry timestamps. add() replaces a transcript's rows when it is (re)made;
+    sync() catches up with transcripts written or deleted behind its back,
+    comparing file mtimes so unchanged transcripts aren't re-read.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def add(self, stem: str, segments: list[dict], mtime: float = 0.0):
+        # Segments without text can't match anything, so they're neither stored nor counted
+        rows = [(s["text"], stem, s["start"], s["end"]) for s in segments if s["text"]]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM segments WHERE stem = ?", (stem,))
+            self._conn.executemany('INSERT INTO segments (text, stem, start, "end") VALUES (?, ?, ?, ?)', rows)
+            self._conn.execute("INSERT OR REPLACE INTO transcripts (stem, mtime, segments) VALUES (?, ?, ?)",
+                               (stem, mtime, len(rows)))
+
+    def remove(self, stem: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM segments WHERE stem = ?", (stem,))
+            self._conn.execute("DELETE FROM transcripts WHERE stem = ?", (stem,))
+
+    def sync(self, transcripts_dir: Path) -> dict:
+        """Indexes new or changed transcripts in transcripts_dir and drops deleted ones."""
+        with self._lock:
+            indexed = dict(self._conn.execute("SELECT stem, mtime FROM transcripts").fetchall())
+        on_disk = {path.stem: path.stat().st_mtime for path in transcripts_dir.glob("*.txt")}
+        changed = [stem for stem, mtime in on_disk.items() if indexed.get(stem) != mtime]
+        for stem in changed:
+            self.add(stem, load_segments(transcripts_dir, stem), on_disk[stem])
+        removed = indexed.keys() - on_disk.keys()
+        for stem in removed:
+            self.remove(stem)
+        return {"indexed": len(changed), "removed": len(removed), "total": len(on_disk)}
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> dict:
+        """Best-matching segments first (BM25), with highlighted snippets."""
+        match = _match_expression(query)
+        if match is None:
+            return {"total": 0, "results": []}
+        with self._lock:
+            total = self._conn.execute("SELECT count(*) FROM segments_fts WHERE segments_fts MATCH ?",
+                                       (match,)).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT s.stem, s.start, s.\"end\", snippet(segments_fts, 0, '{_OPEN}', '{_CLOSE}', '…', 16) "
+                "AS snippet, segments_fts.rank AS rank FROM segments_fts JOIN segments s ON s.id = segments_fts.rowid "
+                "WHERE segments_fts MATCH ? ORDER BY segments_fts.rank LIMIT ? OFFSET ?",
+                (match, limit, offset),
+            ).fetchall()
+        results = [
+            {
+                "stem": row["stem"],
+                "start": row["start"],
+                "end": row["end"],
+                "snippet": html.escape(row["snippet"]).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>"),
+                "score": round(-row["rank"], 3),
+            }
+            for row in rows
+        ]
+        return {"total": total, "results": results}
@@ -1,134 +1,142 @@
 import asyncio
+import json
 import threading
-import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
 
-import numpy as np
-import soundfile as sf
 import sounddevice as sd
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
-# External, non-synced storage (outside the git repo)
-DATA_DIR = Path.home() / "MeetingData"
-RECORDINGS_DIR = DATA_DIR / "recordings"
-TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
-RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
-TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
+from catalog import SORT_COLUMNS, Catalog
+from config import DATA_DIR, PEAKS_DIR, RECORDING_FORMAT, RECORDINGS_DIR, TRANSCRIPTS_DIR
+from engine import get_engine, transcribe_file
+from jobs import JobQueue, job_event
+from live import LiveTranscriber
+from recorder import Recorder
+from search import TranscriptIndex
+from storage import peaks_path, process, reduce_peaks
 
 SAMPLE_RATE = 48000
-WHISPER_MODEL = "mlx-community/whisper-large-v3-turbo"
+AUDIO_SUFFIXES = {".wav": "audio/wav", ".flac": "audio/flac", ".opus": "audio/ogg"}
+JOBS_DB = DATA_DIR / "jobs.sqlite3"
+STORAGE_DB = DATA_DIR / "storage_jobs.sqlite3"
+SEARCH_DB = DATA_DIR / "search.sqlite3"
+CATALOG_DB = DATA_DIR / "catalog.sqlite3"
+TRANSCRIBE_WORKERS = 1  # workers share one loaded model
 
 STATIC_DIR = Path(__file__).parent / "static"
 
 
-class Recorder:
-    """Captures one or two input devices in parallel and mixes them to a mono WAV."""
-
-    def __init__(self):
-        self._lock = threading.Lock()
-        self._streams: list[sd.InputStream] = []
-        self._buffers: list[list[np.ndarray]] = []
-        self.recording = False
-        self.start_time: float | None = None
-        self.name: str | None = None
-
-    def _make_callback(self, slot: int):
-        def callback(indata, frames, time_info, status):
-            # indata is reused by PortAudio, so copy it
-            self._buffers[slot].append(indata.copy())
-        return callback
-
-    def start(self, devices: list[int], name: str | None):
-        with self._lock:
-            if self.recording:
-                raise RuntimeError("Already recording")
-            self._streams = []
-            self._buffers = [[] for _ in devices]
-            for slot, dev in enumerate(devices):
-                info = sd.query_devices(dev)
-                channels = min(2, int(info["max_input_channels"]))
-                if channels < 1:
-                    raise RuntimeError(f"Device {dev} has no input channels")
-                stream = sd.InputStream(
-                    device=dev,
-                    samplerate=SAMPLE_RATE,
-                    channels=channels,
-                    dtype="float32",
-                    callback=self._make_callback(slot),
-                )
-                self._streams.append(stream)
-            # Start all streams as close together as possible
-            for stream in self._streams:
-                stream.start()
-            self.recording = True
-            self.start_time = time.time()
-            self.name = name or "meeting"
-
-    def stop(self) -> Path:
-        with self._lock:
-            if not self.recording:
-                raise RuntimeError("Not recording")
-            for stream in self._streams:
-                stream.stop()
-                stream.close()
-            buffers = self._buffers
-            name = self.name
-            self.recording = False
-            self.start_time = None
-            self._streams = []
-            self._buffers = []
-
-        # Downmix each source to mono float32
-        mono_tracks = []
-        for chunks in buffers:
-            if not chunks:
-                continue
-            data = np.concatenate(chunks, axis=0)
-            mono = data.mean(axis=1) if data.ndim > 1 else data
-            mono_tracks.append(mono.astype(np.float32))
-
-        if not mono_tracks:
-            raise RuntimeError("No audio was captured")
-
-        # Pad to the longest track, then sum
-        length = max(len(t) for t in mono_tracks)
-        mix = np.zeros(length, dtype=np.float32)
-        for t in mono_tracks:
-            mix[: len(t)] += t
-
-        # Prevent clipping
-        peak = float(np.max(np.abs(mix))) if mix.size else 0.0
-        if peak > 1.0:
-            mix /= peak
-
-        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe = "".join(c if c.isalnum() or c in "-_ " else "_" for c in (name or "meeting")).strip()
-        filename = f"{stamp}_{safe}.wav"
-        out_path = RECORDINGS_DIR / filename
-        sf.write(out_path, mix, SAMPLE_RATE, subtype="PCM_16")
-        return out_path
-
-    def status(self) -> dict:
-        elapsed = time.time() - self.start_time if self.recording and self.start_time else 0
-        return {"recording": self.recording, "elapsed": round(elapsed, 1), "name": self.name}
-
-
-recorder = Recorder()
-app = FastAPI(title="Meeting Transcriber")
+catalog = Catalog(CATALOG_DB, RECORDINGS_DIR, TRANSCRIPTS_DIR, AUDIO_SUFFIXES)
+search_index = TranscriptIndex(SEARCH_DB)
+
+
+def _recording_path(filename: str) -> Path:
+    path = (RECORDINGS_DIR / filename).resolve()
+    if path.parent != RECORDINGS_DIR.resolve():
+        raise FileNotFoundError(filename)
+    if not path.exists():
+        # It may have been converted to another format since
+        path = next((p for p in map(path.with_suffix, AUDIO_SUFFIXES) if p.exists()), None)
+        if path is None:
+            raise FileNotFoundError(filename)
+    return path
+
+
+def _transcribed(audio_path: Path, result: dict):
+    text_path = TRANSCRIPTS_DIR / f"{audio_path.stem}.txt"
+    search_index.add(audio_path.stem, result["segments"], text_path.stat().st_mtime)
+    catalog.set_transcript(audio_path.name)
+
+
+def _live_failed(audio_path: Path, error: str):
+    # The recording itself was saved: transcribe it from the file instead
+    job_queue.submit(audio_path.name)
+
+
+def _transcribe(filename: str, report=None) -> str:
+    on_segment = (lambda segment, progress: report(progress, segment)) if report is not None else None
+    audio_path = _recording_path(filename)
+    result = transcribe_file(audio_path, on_segment)
+    _transcribed(audio_path, result)
+    return result["text"]
+
+
+def _store(filename: str, report=None):
+    # Peaks for the waveform, and conversion of WAVs to RECORDING_FORMAT
+    path = _recording_path(filename)
+    stored = process(path, PEAKS_DIR, RECORDING_FORMAT if path.suffix == ".wav" else None)
+    if stored != path:
+        catalog.remove(path.name)
+        catalog.upsert(stored)
+
+
+def _saved(path: Path, duration: float):
+    catalog.upsert(path, round(duration, 2))
+    storage_queue.submit(path.name)
+
+
+def _backfill_storage():
+    # Recordings from before peaks (or before the current format) are caught up in the background
+    for path in RECORDINGS_DIR.iterdir():
+        if path.suffix not in AUDIO_SUFFIXES or (recorder.recording and path == recorder.path):
+            continue
+        convert = path.suffix == ".wav" and RECORDING_FORMAT != "wav"
+        if convert or not peaks_path(PEAKS_DIR, path).exists():
+            storage_queue.submit(path.name)
+
+
+def _sync_catalog():
+    # The file being recorded is added by the recorder once it is finished
+    catalog.sync(skip={recorder.path.name} if recorder.recording else set())
+
+
+def _warm_engine():
+    # Loads the model once, in the background, so the first job doesn't pay for it
+    try:
+        get_engine()
+    except Exception as e:
+        print(f"Transcription engine not loaded: {type(e).__name__}: {e}")
+
+
+job_queue = JobQueue(JOBS_DB, _transcribe, workers=TRANSCRIBE_WORKERS)
+storage_queue = JobQueue(STORAGE_DB, _store, name="storage")
+recorder = Recorder(RECORDINGS_DIR, SAMPLE_RATE, RECORDING_FORMAT, on_saved=_saved)
+live: LiveTranscriber | None = None  # transcriber of the current (or last) live recording
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threading.Thread(target=_warm_engine, name="engine-warmup", daemon=True).start()
+    threading.Thread(target=_sync_catalog, name="catalog-sync", daemon=True).start()
+    # Picks up transcripts made or deleted while the server was down (e.g. by transcribe.py)
+    threading.Thread(target=search_index.sync, args=(TRANSCRIPTS_DIR,), name="search-sync", daemon=True).start()
+    # Resumes jobs that were queued or running when the server last stopped
+    job_queue.start()
+    storage_queue.start()
+    threading.Thread(target=_backfill_storage, name="storage-backfill", daemon=True).start()
+    yield
+    job_queue.stop(timeout=1)
+    storage_queue.stop(timeout=1)
+
+
+app = FastAPI(title="Meeting Transcriber", lifespan=lifespan)
 
 
 class StartRequest(BaseModel):
     mic: int | None = None
     system: int | None = None
     name: str | None = None
+    live: bool = False  # transcribe while recording
 
 
 class TranscribeRequest(BaseModel):
     filename: str
+    priority: int = 0
 
 
 @app.get("/api/devices")
@@ -147,7 +155,7 @@ def list_devices():
 
 @app.get("/api/status")
 def status():
-    return recorder.status()
+    return {**recorder.status(), "live": live is not None and not live.done}
 
 
 @app.post("/api/start")
@@ -155,63 +163,169 @@ def start(req: StartRequest):
     devices = [d for d in (req.mic, req.system) if d is not None]
     if not devices:
         raise HTTPException(400, "Select at least one input device")
+    global live
+    session = LiveTranscriber(SAMPLE_RATE, on_done=_transcribed, on_error=_live_failed) if req.live else None
     try:
-        recorder.start(devices, req.name)
+        recorder.start(devices, req.name, listener=session.feed if session else None)
     except Exception as e:
+        if session is not None:
+            session.cancel()
         raise HTTPException(400, str(e))
-    return recorder.status()
+    if session is not None:
+        live = session
+    return status()
 
 
 @app.post("/api/stop")
 def stop():
+    global live
+    # The live transcriber belongs to this recording if it hasn't been given a file yet
+    session = live if live is not None and live.path is None else None
     try:
         path = recorder.stop()
     except Exception as e:
+        if session is not None:
+            session.cancel()
+            live = None  # or the next recording, live or not, would adopt it
         raise HTTPException(400, str(e))
-    return {"filename": path.name}
+    if session is not None:
+        # Only the last few seconds are left to transcribe; /api/live/events reports when it's saved
+        session.finish(path)
+    return {"filename": path.name, "live": session is not None}
+
+
+@app.get("/api/live/events")
+async def live_events():
+    """Server-sent events: newly finalized segments and the current partial ones, until the transcript is saved."""
+    session = live
+    if session is None:
+        raise HTTPException(404, "No live transcription")
+
+    async def stream():
+        seen, sent = None, 0
+        while True:
+            if session.version != seen:
+                seen = session.version
+                snapshot = session.snapshot(sent)
+                sent = snapshot["finals"]
+                yield f"event: live\ndata: {json.dumps(snapshot)}\n\n"
+                if snapshot["done"]:
+                    return
+            await asyncio.sleep(0.25)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+def _recording_item(row: dict, active: dict[str, dict]) -> dict:
+    return {
+        "filename": row["filename"],
+        "size_mb": round(row["size"] / 1_000_000, 2),
+        "duration": row["duration"],
+        "created": datetime.fromtimestamp(row["created"]).strftime("%Y-%m-%d %H:%M"),
+        "has_transcript": bool(row["has_transcript"]),
+        "job": active.get(row["filename"]),
+    }
 
 
 @app.get("/api/recordings")
-def recordings():
-    items = []
-    for f in sorted(RECORDINGS_DIR.glob("*.wav"), reverse=True):
-        transcript = TRANSCRIPTS_DIR / f"{f.stem}.txt"
-        items.append({
-            "filename": f.name,
-            "size_mb": round(f.stat().st_size / 1_000_000, 2),
-            "created": datetime.fromtimestamp(f.stat().st_mtime).strftime("%Y-%m-%d %H:%M"),
-            "has_transcript": transcript.exists(),
-        })
-    return {"recordings": items}
+def recordings(sort: str = "created", order: str = "desc", limit: int = 50, offset: int = 0):
+    """A page of the recordings catalog; sort by created, name, size or duration."""
+    if sort not in SORT_COLUMNS or order not in ("asc", "desc"):
+        raise HTTPException(400, f"sort must be one of {sorted(SORT_COLUMNS)}, order asc or desc")
+    _sync_catalog()
+    limit, offset = max(1, min(limit, 200)), max(0, offset)
+    found = catalog.page(sort, order == "desc", limit, offset)
+    active = job_queue.active()
+    return {
+        "total": found["total"],
+        "limit": limit,
+        "offset": offset,
+        "recordings": [_recording_item(row, active) for row in found["recordings"]],
+    }
+
+
+@app.get("/api/recordings/{filename}")
+def recording(filename: str):
+    row = catalog.get(filename)
+    if row is None:
+        raise HTTPException(404, "Recording not found")
+    return _recording_item(row, job_queue.active())
 
 
 @app.get("/audio/{filename}")
 def audio(filename: str):
-    path = (RECORDINGS_DIR / filename).resolve()
-    if path.parent != RECORDINGS_DIR.resolve() or not path.exists():
+    try:
+        path = _recording_path(filename)
+    except FileNotFoundError:
         raise HTTPException(404, "Not found")
-    return FileResponse(path, media_type="audio/wav")
-
+    # FileResponse answers Range requests (206), so players fetch only what they play or seek to
+    return FileResponse(path, media_type=AUDIO_SUFFIXES.get(path.suffix, "application/octet-stream"))
 
-def _transcribe(filename: str) -> str:
-    import mlx_whisper
 
-    audio_path = (RECORDINGS_DIR / filename).resolve()
-    if audio_path.parent != RECORDINGS_DIR.resolve() or not audio_path.exists():
-        raise FileNotFoundError(filename)
-    result = mlx_whisper.transcribe(str(audio_path), path_or_hf_repo=WHISPER_MODEL)
-    text = result["text"].strip()
-    (TRANSCRIPTS_DIR / f"{audio_path.stem}.txt").write_text(text)
-    return text
+@app.get("/api/peaks/{filename}")
+def peaks(filename: str, points: int = 0):
+    """Waveform envelope (audiowaveform JSON), optionally reduced to at most `points` min/max pairs."""
+    path = peaks_path(PEAKS_DIR, Path(filename))
+    if not path.exists():
+        raise HTTPException(404, "No peaks yet")
+    if points <= 0:
+        return FileResponse(path, media_type="application/json")
+    return JSONResponse(reduce_peaks(json.loads(path.read_text()), points))
 
 
-@app.post("/api/transcribe")
-async def transcribe(req: TranscribeRequest):
+@app.post("/api/transcribe", status_code=202)
+def transcribe(req: TranscribeRequest):
     try:
-        text = await asyncio.to_thread(_transcribe, req.filename)
+        _recording_path(req.filename)
     except FileNotFoundError:
         raise HTTPException(404, "Recording not found")
-    return {"text": text}
+    return {"job": job_queue.submit(req.filename, req.priority)}
+
+
+@app.get("/api/jobs")
+def jobs(status: str | None = None, limit: int = 100):
+    return {"jobs": job_queue.list(status, limit)}
+
+
+@app.get("/api/jobs/{job_id}")
+def job(job_id: int):
+    found = job_queue.get(job_id)
+    if found is None:
+        raise HTTPException(404, "No such job")
+    return found
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: int):
+    """Server-sent events: the job (with partial segments) whenever it changes, until it ends."""
+    if job_queue.get(job_id) is None:
+        raise HTTPException(404, "No such job")
+
+    async def stream():
+        seen, last = None, None
+        while True:
+            if job_queue.version != seen:
+                seen = job_queue.version
+                current = job_queue.get(job_id)
+                if current != last:
+                    last = current
+                    yield job_event(current)
+                if current["status"] in ("done", "failed"):
+                    return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.get("/api/search")
+def search(q: str, limit: int = 20, offset: int = 0):
+    """Transcript segments matching q, best first, with highlighted snippets and timestamps."""
+    limit, offset = max(1, min(limit, 100)), max(0, offset)
+    found = search_index.search(q, limit, offset)
+    for hit in found["results"]:
+        hit["filename"] = next((f"{hit['stem']}{suffix}" for suffix in AUDIO_SUFFIXES
+                                if (RECORDINGS_DIR / f"{hit['stem']}{suffix}").exists()), None)
+    return {"query": q, "limit": limit, "offset": offset, **found}
 
 
 @app.get("/api/transcript/{filename}")
@@ -220,7 +334,18 @@ def transcript(filename: str):
     path = TRANSCRIPTS_DIR / f"{stem}.txt"
     if not path.exists():
         raise HTTPException(404, "No transcript")
-    return {"text": path.read_text()}
+    # Transcripts made before segment timestamps were saved only have the text
+    segments_path = TRANSCRIPTS_DIR / f"{stem}.json"
+    segments = json.loads(segments_path.read_text())["segments"] if segments_path.exists() else []
+    return {"text": path.read_text(), "segments": segments}
+
+
+@app.get("/api/transcript/{filename}/vtt")
+def transcript_vtt(filename: str):
+    path = TRANSCRIPTS_DIR / f"{Path(filename).stem}.vtt"
+    if not path.exists():
+        raise HTTPException(404, "No transcript")
+    return FileResponse(path, media_type="text/vtt", filename=path.name)
 
 
 app.mount("/", StaticFiles(directory=STATIC_DIR, html=True), name="static")
@@ -0,0 +1,119 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from audio_buffer import downmix
+
+# Storage formats: soundfile container and subtype. FLAC is lossless at about
+# half the size of WAV; Opus is lossy but a small fraction of it, and plenty for speech.
+FORMATS = {"wav": ("WAV", "PCM_16"), "flac": ("FLAC", "PCM_16"), "opus": ("OGG", "OPUS")}
+OPUS_SAMPLE_RATES = {8000, 12000, 16000, 24000, 48000}
+PEAKS_PER_SECOND = 20  # waveform resolution; an hour is 72k min/max pairs
+BLOCK_SECONDS = 10
+
+
+class Peaks:
+    """
+    Min/max waveform envelope of mono audio, built a block at a time, in the
+    audiowaveform JSON layout (8-bit, interleaved min/max) that waveform
+    players understand.
+    """
+
+    def __init__(self, sample_rate: int, per_second: int = PEAKS_PER_SECOND):
+        self.sample_rate = sample_rate
+        self.samples_per_peak = max(1, sample_rate // per_second)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._data: list[np.ndarray] = []
+
+    def add(self, samples: np.ndarray):
+        samples = np.concatenate((self._pending, samples))
+        n = len(samples) // self.samples_per_peak
+        frames = samples[:n * self.samples_per_peak].reshape(n, self.samples_per_peak)
+        self._data.append(self._envelope(frames))
+        self._pending = samples[n * self.samples_per_peak:]
+
+    @staticmethod
+    def _envelope(frames: np.ndarray) -> np.ndarray:
+        pairs = np.stack((frames.min(axis=1), frames.max(axis=1)), axis=1).ravel()
+        return np.clip(np.round(pairs * 127), -128, 127).astype(np.int8)
+
+    def to_dict(self) -> dict:
+        data = self._data
+        if len(self._pending):
+            data = data + [self._envelope(self._pending[None, :])]
+        data = np.concatenate(data) if data else np.zeros(0, dtype=np.int8)
+        return {
+            "version": 2,
+            "channels": 1,
+            "sample_rate": self.sample_rate,
+            "samples_per_pixel": self.samples_per_peak,
+            "bits": 8,
+            "length": len(data) // 2,
+            "data": data.tolist(),
+        }
+
+
+def reduce_peaks(peaks: dict, points: int) -> dict:
+    """The same envelope at no more than points pairs, for drawing at a given width."""
+    data = np.asarray(peaks["data"], dtype=np.int16).reshape(-1, 2)
+    group = -(-len(data) // points) if points > 0 else 1
+    if group <= 1:
+        return peaks
+    pad = -len(data) % group
+    if pad:
+        data = np.concatenate((data, np.repeat(data[-1:], pad, axis=0)))
+    grouped = data.reshape(-1, group, 2)
+    reduced = np.stack((grouped[:, :, 0].min(axis=1), grouped[:, :, 1].max(axis=1)), axis=1).ravel()
+    return {**peaks, "samples_per_pixel": peaks["samples_per_pixel"] * group, "length": len(reduced) // 2,
+            "data": reduced.tolist()}
+
+
+def peaks_path(peaks_dir: Path, audio_path: Path) -> Path:
+    return peaks_dir / f"{audio_path.stem}.json"
+
+
+def process(path: Path, peaks_dir: Path, file_format: str | None = None) -> Path:
+    """
+    Writes the peaks file for a recording and, if file_format is given and
+    differs from the file's own, converts it in the same pass. The converted
+    file replaces the original (keeping its mtime) only once complete.
+    Returns the recording's path afterwards.
+    """
+    stat = path.stat()
+    with sf.SoundFile(path) as src:
+        if file_format == "opus" and src.samplerate not in OPUS_SAMPLE_RATES:
+            file_format = "flac"  # Opus can't store this rate; still compress it losslessly
+        target = None
+        if file_format is not None and path.suffix != f".{file_format}":
+            target = path.with_suffix(f".{file_format}")
+        peaks = Peaks(src.samplerate)
+        partial = target.with_name(target.name + ".part") if target is not None else None
+        dst = None
+        if partial is not None:
+            container, subtype = FORMATS[file_format]
+            dst = sf.SoundFile(partial, "w", samplerate=src.samplerate, channels=src.channels,
+                               format=container, subtype=subtype)
+        try:
+            for block in src.blocks(blocksize=BLOCK_SECONDS * src.samplerate, dtype="float32", always_2d=True):
+                peaks.add(downmix(block))
+                if dst is not None:
+                    dst.write(block)
+        except Exception:
+            if dst is not None:
+                dst.close()
+                partial.unlink(missing_ok=True)
+            raise
+        if dst is not None:
+            dst.close()
+
+    out = peaks_path(peaks_dir, path)
+    out.write_text(json.dumps(peaks.to_dict(), separators=(",", ":")))
+    if partial is None:
+        return path
+    os.utime(partial, (stat.st_atime, stat.st_mtime))
+    os.replace(partial, target)
+    path.unlink()
+    return target
@@ -1,11 +1,8 @@
 import sys
-import mlx_whisper
 from pathlib import Path
 
-# External, non-synced storage
-DATA_DIR = Path.home() / "MeetingData"
-TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
-TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
+from config import TRANSCRIPTS_DIR, WHISPER_BACKEND, WHISPER_MODEL
+from engine import transcribe_file
 
 if len(sys.argv) < 2:
     print("Usage: uv run python transcribe.py <audio_file>")
@@ -16,14 +13,9 @@ if not audio_path.exists():
     print(f"File not found: {audio_path}")
     sys.exit(1)
 
-print(f"Transcribing {audio_path.name}...")
-result = mlx_whisper.transcribe(
-    str(audio_path),
-    path_or_hf_repo="mlx-community/whisper-large-v3-turbo",
-)
+print(f"Transcribing {audio_path.name} with {WHISPER_BACKEND} ({WHISPER_MODEL})...")
+result = transcribe_file(audio_path)
 
-output_path = TRANSCRIPTS_DIR / f"{audio_path.stem}.txt"
-output_path.write_text(result["text"])
-print(f"Transcript saved to {output_path}")
+print(f"Transcript saved to {TRANSCRIPTS_DIR / f'{audio_path.stem}.txt'}")
 print("\n--- Transcript preview ---")
 print(result["text"][:500])
@@ -0,0 +1,140 @@
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+# Whisper models work on 16 kHz mono
+MODEL_SAMPLE_RATE = 16000
+
+FRAME_SECONDS = 0.03  # energy is measured over 30 ms frames
+SPEECH_MARGIN_DB = 10  # a frame is speech when this much louder than the noise floor...
+THRESHOLD_RANGE_DB = (-60, -35)  # ...with the threshold kept within these absolute levels
+MIN_SILENCE_SECONDS = 0.6  # shorter pauses stay inside a speech region
+MIN_SPEECH_SECONDS = 0.25  # shorter blips (clicks, keyboard) are dropped
+PAD_SECONDS = 0.2  # kept around each region so word onsets and tails aren't clipped
+MERGE_GAP_SECONDS = 2.0  # regions closer than this are transcribed together
+MAX_CHUNK_SECONDS = 30  # Whisper's window; longer speech is split at its quietest point
+
+
+def _lowpass(cutoff: float, taps: int = 101) -> np.ndarray:
+    # Windowed-sinc FIR, cutoff as a fraction of the sample rate
+    n = np.arange(taps) - (taps - 1) / 2
+    h = np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return (h / h.sum()).astype(np.float32)
+
+
+class Resampler:
+    """
+    Streaming conversion of mono audio to MODEL_SAMPLE_RATE: FIR anti-aliasing
+    when downsampling, then linear interpolation. Blocks can be any length; the
+    filter history and interpolation position carry over between them.
+    """
+
+    def __init__(self, sample_rate: int):
+        self.step = sample_rate / MODEL_SAMPLE_RATE
+        # The filter's ~1 ms delay is ignored
+        self._h = _lowpass(0.45 / self.step) if self.step > 1 else None
+        self._history = np.zeros(len(self._h) - 1 if self._h is not None else 0, dtype=np.float32)
+        self._carry = np.zeros(0, dtype=np.float32)  # last input sample, for interpolation across blocks
+        self._position = 0.0  # input index of the next output sample
+        self._consumed = 0  # input samples before the current block
+
+    def process(self, mono: np.ndarray) -> np.ndarray:
+        if self._h is not None:
+            padded = np.concatenate((self._history, mono))
+            self._history = padded[len(padded) - len(self._history):]
+            mono = np.convolve(padded, self._h, mode="valid").astype(np.float32)
+        samples = np.concatenate((self._carry, mono))
+        base = self._consumed - len(self._carry)
+        last = self._consumed + len(mono) - 1
+        count = int(np.floor((last - self._position) / self.step)) + 1 if last >= self._position else 0
+        positions = self._position + self.step * np.arange(count)
+        out = np.interp(positions, np.arange(base, last + 1), samples).astype(np.float32)
+        self._position += self.step * count
+        self._consumed += len(mono)
+        self._carry = mono[-1:]
+        return out
+
+
+def load_audio(path: Path, block_seconds: int = 30) -> np.ndarray:
+    """
+    Reads an audio file as 16 kHz mono float32, a block at a time so a long
+    recording is never held at its original rate.
+    """
+    with sf.SoundFile(path) as f:
+        resampler = Resampler(f.samplerate)
+        pieces = [resampler.process(block.mean(axis=1, dtype=np.float32))
+                  for block in f.blocks(blocksize=block_seconds * f.samplerate, dtype="float32", always_2d=True)]
+    return np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+
+
+def frame_levels(audio: np.ndarray, sample_rate: int = MODEL_SAMPLE_RATE) -> np.ndarray:
+    """RMS level in dBFS of each FRAME_SECONDS frame."""
+    frame = int(FRAME_SECONDS * sample_rate)
+    n = len(audio) // frame
+    energy = np.square(audio[:n * frame].reshape(n, frame), dtype=np.float64).mean(axis=1)
+    return 10 * np.log10(energy + 1e-10)
+
+
+def speech_regions(levels: np.ndarray) -> list[tuple[int, int]]:
+    """[start, end) frame ranges that contain speech, padded and with short pauses bridged."""
+    if len(levels) == 0:
+        return []
+    # Noise floor: the level most of the quiet frames sit at
+    threshold = np.clip(np.percentile(levels, 10) + SPEECH_MARGIN_DB, *THRESHOLD_RANGE_DB)
+    speech = np.concatenate(([0], (levels > threshold).astype(np.int8), [0]))
+    runs = np.flatnonzero(np.diff(speech)).reshape(-1, 2)
+
+    min_silence = MIN_SILENCE_SECONDS / FRAME_SECONDS
+    regions = []
+    for start, end in runs:
+        if regions and start - regions[-1][1] < min_silence:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    pad = int(PAD_SECONDS / FRAME_SECONDS)
+    padded = []
+    for start, end in regions:
+        if end - start < MIN_SPEECH_SECONDS / FRAME_SECONDS:
+            continue
+        start, end = max(0, start - pad), min(len(levels), end + pad)
+        if padded and start <= padded[-1][1]:
+            padded[-1] = (padded[-1][0], end)
+        else:
+            padded.append((int(start), int(end)))
+    return padded
+
+
+def plan_chunks(regions: list[tuple[int, int]], levels: np.ndarray,
+                max_frames: int = int(MAX_CHUNK_SECONDS / FRAME_SECONDS)) -> list[tuple[int, int]]:
+    """
+    Groups speech regions into chunks of at most max_frames. Nearby regions
+    share a chunk; a region longer than max_frames is cut at the quietest
+    frame in the second half of each window.
+    """
+    merge_gap = MERGE_GAP_SECONDS / FRAME_SECONDS
+    chunks = []
+    for start, end in regions:
+        pieces = []
+        while end - start > max_frames:
+            window = levels[start + max_frames // 2:start + max_frames]
+            cut = start + max_frames // 2 + int(np.argmin(window))
+            pieces.append((start, cut))
+            start = cut
+        pieces.append((start, end))
+        for start, end in pieces:
+            if chunks and start - chunks[-1][1] <= merge_gap and end - chunks[-1][0] <= max_frames:
+                chunks[-1] = (chunks[-1][0], end)
+            else:
+                chunks.append((start, end))
+    return chunks
+
+
+def split_on_silence(audio: np.ndarray, sample_rate: int = MODEL_SAMPLE_RATE,
+                     max_seconds: float = MAX_CHUNK_SECONDS) -> list[tuple[int, int]]:
+    """[start, end) sample ranges of audio worth transcribing; silence in between is skipped."""
+    levels = frame_levels(audio, sample_rate)
+    frame = int(FRAME_SECONDS * sample_rate)
+    chunks = plan_chunks(speech_regions(levels), levels, int(max_seconds / FRAME_SECONDS))
+    return [(start * frame, min(len(audio), end * frame)) for start, end in chunks]
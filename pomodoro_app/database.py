@@ -1,10 +1,18 @@
+import os
 import sqlite3
+import threading
 from pathlib import Path
 
-DB_PATH = Path(__file__).parent / "pomodoro.db"
+DB_PATH = Path(os.getenv("POMODORO_DB", Path(__file__).parent / "pomodoro.db"))
 
-def get_db():
+_local = threading.local()
+
+
+def init_db():
+    """Creates the table and switches the database to WAL. Run once at startup."""
     conn = sqlite3.connect(DB_PATH)
+    # WAL is a property of the database file: readers no longer wait for writers
+    conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("""
         CREATE TABLE IF NOT EXISTS pomo_logs (
             date TEXT PRIMARY KEY,
@@ -12,37 +20,49 @@ def get_db():
         )
     """)
     conn.commit()
+    conn.close()
+
+
+def get_db() -> sqlite3.Connection:
+    """
+    The calling thread's connection, opened on first use and then kept, so
+    each statement is prepared once per thread (sqlite3 caches them per connection).
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=5)
+        # Durable across application crashes; with WAL only a power loss can drop the last commits
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
     return conn
 
+
 def get_pomos(date: str) -> int:
-    conn = get_db()
-    row = conn.execute("SELECT count FROM pomo_logs WHERE date = ?", (date,)).fetchone()
-    conn.close()
+    row = get_db().execute("SELECT count FROM pomo_logs WHERE date = ?", (date,)).fetchone()
     return row[0] if row else 0
 
+
 def set_pomos(date: str, count: int) -> int:
     conn = get_db()
-    conn.execute(
-        "INSERT INTO pomo_logs (date, count) VALUES (?, ?) ON CONFLICT(date) DO UPDATE SET count = ?",
-        (date, count, count)
-    )
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(
+            "INSERT INTO pomo_logs (date, count) VALUES (?, ?) ON CONFLICT(date) DO UPDATE SET count = excluded.count",
+            (date, count)
+        )
     return count
 
+
 def increment_pomos(date: str) -> int:
     conn = get_db()
-    conn.execute(
-        "INSERT INTO pomo_logs (date, count) VALUES (?, 1) ON CONFLICT(date) DO UPDATE SET count = count + 1",
-        (date,)
-    )
-    conn.commit()
-    row = conn.execute("SELECT count FROM pomo_logs WHERE date = ?", (date,)).fetchone()
-    conn.close()
+    with conn:
+        row = conn.execute(
+            "INSERT INTO pomo_logs (date, count) VALUES (?, 1) "
+            "ON CONFLICT(date) DO UPDATE SET count = count + 1 RETURNING count",
+            (date,)
+        ).fetchone()
     return row[0]
 
+
 def get_all_pomos() -> list[dict]:
-    conn = get_db()
-    rows = conn.execute("SELECT date, count FROM pomo_logs ORDER BY date").fetchall()
-    conn.close()
-    return [{"date": r[0], "count": r[1]} for r in rows]
\ No newline at end of file
+    rows = get_db().execute("SELECT date, count FROM pomo_logs ORDER BY date").fetchall()
+    return [{"date": r[0], "count": r[1]} for r in rows]
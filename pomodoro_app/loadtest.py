@@ -0,0 +1,99 @@
+"""
+Load test for the pomodoro API: N client threads on keep-alive connections
+send a mix of reads, increments, updates and listings for a fixed time, then
+requests/s and latency percentiles are printed per endpoint.
+
+    POMODORO_DB=/tmp/loadtest.db uv run uvicorn main:app --port 8000     (in another terminal)
+    uv run python loadtest.py [--url http://127.0.0.1:8000] [--clients 32] [--seconds 10]
+
+Point the server at a scratch database as above: the test writes counts for
+dates in LOADTEST_YEAR.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+LOADTEST_YEAR = 1999
+# (name, weight): mostly the calls the timer page makes
+MIX = [("get", 50), ("increment", 30), ("put", 10), ("list", 10)]
+
+
+def _dates(n=30):
+    return [f"{LOADTEST_YEAR}-01-{day:02d}" for day in range(1, n + 1)]
+
+
+def _request(conn, name, date):
+    if name == "get":
+        conn.request("GET", f"/api/pomos/{date}")
+    elif name == "increment":
+        conn.request("POST", f"/api/pomos/{date}/increment")
+    elif name == "put":
+        conn.request("PUT", f"/api/pomos/{date}", body=json.dumps({"count": random.randint(0, 12)}),
+                     headers={"Content-Type": "application/json"})
+    else:
+        conn.request("GET", "/api/pomos")
+    response = conn.getresponse()
+    response.read()
+    if response.status != 200:
+        raise RuntimeError(f"{name} {date}: HTTP {response.status}")
+
+
+def _client(host, port, deadline, results, errors):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    names, weights = zip(*MIX)
+    dates = _dates()
+    while time.perf_counter() < deadline:
+        name = random.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            _request(conn, name, random.choice(dates))
+        except Exception:
+            errors.append(name)
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        results.append((name, time.perf_counter() - start))
+    conn.close()
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1)))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the pomodoro API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    results, errors = [], []
+    deadline = time.perf_counter() + args.seconds
+    threads = [threading.Thread(target=_client, args=(host, port, deadline, results, errors))
+               for _ in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.clients} clients, {elapsed:.1f} s: {len(results) / elapsed:.0f} requests/s, {len(errors)} errors")
+    print(f"{'endpoint':>10} {'requests':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, _ in MIX + [("all", 0)]:
+        latencies = [seconds for n, seconds in results if name in (n, "all")]
+        if latencies:
+            print(f"{name:>10} {len(latencies):>9} {_percentile(latencies, 0.5):>8.1f} "
+                  f"{_percentile(latencies, 0.95):>8.1f} {_percentile(latencies, 0.99):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
@@ -5,7 +7,14 @@ from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 import database as db
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db.init_db()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
@@ -16,17 +25,21 @@ class PomoUpdate(BaseModel):
 async def index(request: Request):
     return templates.TemplateResponse(name="index.html", request=request)
 
+# The database handlers are plain functions: FastAPI runs them in its thread
+# pool, so SQLite calls never block the event loop (and each pool thread
+# reuses its own connection, see database.get_db)
+
 @app.get("/api/pomos/{date}")
-async def get_pomos(date: str):
+def get_pomos(date: str):
     return {"date": date, "count": db.get_pomos(date)}
 
 @app.put("/api/pomos/{date}")
-async def update_pomos(date: str, body: PomoUpdate):
+def update_pomos(date: str, body: PomoUpdate):
     count = db.set_pomos(date, body.count)
     return {"date": date, "count": count}
 
 @app.post("/api/pomos/{date}/increment")
-async def increment_pomos(date: str):
+def increment_pomos(date: str):
     count = db.increment_pomos(date)
     return {"date": date, "count": count}
 
@@ -35,5 +48,5 @@ async def analytics(request: Request):
     return templates.TemplateResponse(name="analytics.html", request=request)
 
 @app.get("/api/pomos")
-async def get_all_pomos():
+def get_all_pomos():
     return db.get_all_pomos()